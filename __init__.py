@@ -34,6 +34,12 @@ from nl4ds.chatipums import *
 from nl4ds.eda_functions import *
 
 from .settings import *
+from . import settings
+from .metadata_cache import METADATA_CACHE_DIR, cached_profile
+from .optimize_data import encode_categoricals, optimize_dtypes
+from .load_data import load_extract_chunked
+from .session_store import SessionStore
+from .parallel import disable_parallel, enable_parallel
 
 # from .ClientStateMachine import ClientStateMachine
 # from .ui import main_menu
@@ -42,47 +48,73 @@ from .settings import *
 # from .selection import *
 
 
-def run(_data: pd.DataFrame):
-    if not isinstance(_data, pd.DataFrame):
+def run(
+    _data: pd.DataFrame | None = None,
+    source_path: str | None = None,
+    cache_dir: str | None = METADATA_CACHE_DIR,
+    encode_categories: bool | list = False,
+    session_path: str | None = None,
+    downcast: bool = False,
+    parallel: bool | int = False,
+    weight: str | None = None,
+):
+    store = SessionStore(session_path) if session_path else None
+    reopened = _data is None and store is not None and store.exists()
+    if reopened:
+        # Reopen the session saved by an earlier run(data, session_path=...)
+        _data = store.open()
+    elif not isinstance(_data, pd.DataFrame):
         raise ValueError(
             "You must initialize global variable `data`. It must be a pandas DataFrame instance"
         )
 
-    global filtered_df, selections, numerical_attributes, categorical_attributes, csm, data, options_list, option_value_dictionary
+    global filtered_df, selections, numerical_attributes, categorical_attributes, csm, data, options_list, option_value_dictionary, profile
     data = _data
     filtered_df = None
     selections = {}
 
-    numerical_attributes = []
-    categorical_attributes = []
+    if downcast:
+        data = optimize_dtypes(data)
 
-    csm = ClientStateMachine()
-    numerical_attributes = (
-        data.select_dtypes(include=[np.number]).columns.sort_values().tolist()
-    )
-    categorical_attributes = (
-        data.select_dtypes(exclude=[np.number]).columns.sort_values().tolist()
-    )
+    if encode_categories:
+        # True encodes the eligible object columns, a list also names integer
+        # code variables such as STATEFIP or SEX
+        data = encode_categoricals(
+            data, columns=None if encode_categories is True else encode_categories
+        )
+
+    profile = None
+    if store is not None:
+        if not reopened or downcast or encode_categories:
+            store.save(data)
+            # Work on the memory-mapped copy so the in-memory frame can be freed
+            data = store.open()
+        profile = store.load_profile()
+
+    # True uses PARALLEL_WORKERS processes, an int sets the number
+    if parallel is True:
+        enable_parallel()
+    elif parallel:
+        enable_parallel(parallel)
+    else:
+        disable_parallel()
 
-    options_list = data.columns.sort_values().tolist()
-    option_value_dictionary = {}
-    for attribute in data.columns:
-        options_list.append(attribute)
-        option_values = data[attribute].unique()
+    if weight is not None and weight not in data.columns:
+        raise ValueError(f"The weight column {weight!r} is not in the data")
+    # Frequency tables are weighted by it, plots default to it
+    settings.weight = weight
 
-        try:
-            if float("nan") or np.nan or pd.NA in option_values:
-                option_values = option_values[~pd.isna(option_values)]
-                nan_ind = np.where(option_values == "nan")[0]
-                if nan_ind.size > 0:
-                    option_values = np.delete(option_values, nan_ind[0])
-                option_value_dictionary[attribute] = tuple(["nan"]) + tuple(
-                    sorted(option_values)
-                )
-            else:
-                option_value_dictionary[attribute] = tuple(sorted(option_values))
-        except Exception as _:
-            option_value_dictionary[attribute] = tuple(option_values)
+    csm = ClientStateMachine()
+    if profile is None:
+        profile = cached_profile(data, source_path=source_path, cache_dir=cache_dir)
+        if store is not None:
+            store.save_profile(profile)
+    settings.profile = profile
+
+    numerical_attributes = profile.numerical_attributes
+    categorical_attributes = profile.categorical_attributes
+    options_list = profile.options_list
+    option_value_dictionary = profile.option_value_dictionary
 
     filtered_df = None
     selections = {}
@@ -0,0 +1,103 @@
+import hashlib
+import json
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .metadata_cache import fingerprint_dataframe
+
+# Total size of the cached aggregation results before the least recently
+# used ones are evicted.
+AGGREGATION_CACHE_BYTES = 256 * 1024**2
+
+
+def _canonical(value):
+    if isinstance(value, dict):
+        return [[_canonical(k), _canonical(v)] for k, v in sorted(value.items())]
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def aggregation_key(data: pd.DataFrame, **parameters) -> str:
+    """
+    Hash the DataFrame fingerprint and the plot parameters into a cache key.
+
+    Dicts are ordered by key, lists and tuples are treated alike and numpy
+    scalars are converted, so equivalent configurations share a key.
+
+    Parameters:
+    data (pd.DataFrame): The DataFrame being plotted.
+    **parameters: Filters, axes, groups and everything else the result
+    depends on.
+
+    Returns:
+    str: Hex digest of the canonical parameters.
+    """
+    payload = json.dumps(
+        [fingerprint_dataframe(data), _canonical(parameters)],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _result_size(result) -> int:
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(deep=True).sum())
+    if isinstance(result, pd.Series):
+        return int(result.memory_usage(deep=True))
+    if isinstance(result, (list, tuple)):
+        return sum(_result_size(item) for item in result)
+    return 64
+
+
+class AggregationCache:
+    """
+    LRU cache of aggregated Series/DataFrames with memory-based eviction.
+    """
+
+    def __init__(self, max_bytes: int = AGGREGATION_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str):
+        """
+        Return the cached result of the key, or None on a cache miss.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: str, result):
+        """
+        Store a result, evicting the least recently used ones until the cache
+        fits in `max_bytes`. Results larger than the whole cache are not kept.
+        """
+        size = _result_size(result)
+        if key in self._entries:
+            self.size -= self._entries.pop(key)[1]
+        if size > self.max_bytes:
+            return
+
+        self._entries[key] = (result, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+
+aggregation_cache = AggregationCache()
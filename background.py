@@ -0,0 +1,161 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Callable
+
+import ipywidgets as widgets
+from IPython.core.formatters import format_display_data
+
+# A single worker runs the computations one at a time: the filter masks and
+# the aggregation cache they share are not thread-safe.
+BACKGROUND_WORKERS = 1
+
+_executor = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=BACKGROUND_WORKERS, thread_name_prefix="dataviz"
+        )
+    return _executor
+
+
+def _output_entry(obj) -> dict:
+    # Build the output entries by hand: display() called from a worker thread
+    # would go to whichever cell is executing, not to the Output widget
+    if isinstance(obj, str):
+        return {"output_type": "stream", "name": "stdout", "text": f"{obj}\n"}
+    if isinstance(obj, widgets.Widget):
+        data = {
+            "text/plain": repr(obj),
+            "application/vnd.jupyter.widget-view+json": {
+                "version_major": 2,
+                "version_minor": 0,
+                "model_id": obj.model_id,
+            },
+        }
+        return {"output_type": "display_data", "data": data, "metadata": {}}
+    data, metadata = format_display_data(obj)
+    return {"output_type": "display_data", "data": data, "metadata": metadata}
+
+
+class BackgroundRunner:
+    """
+    Runs the computations behind a widget callback off the kernel thread and
+    renders their results into an Output widget.
+
+    Each submit() supersedes the previous one: a computation still waiting
+    for the worker is cancelled, and the result of one already running is
+    discarded when it finishes, so only the latest click is ever rendered.
+
+    Attributes:
+    output_widget (widgets.Output): Where the status and the results go.
+    """
+
+    def __init__(self, output_widget: widgets.Output, executor=None):
+        self.output_widget = output_widget
+        self.executor = executor or get_executor()
+        self._generation = 0
+        self._future = None
+        self._lock = threading.Lock()
+
+    def show(self, *objects):
+        """
+        Replace the content of the output widget with the given objects.
+        Strings are printed, widgets, figures and DataFrames are displayed.
+        """
+        self.output_widget.outputs = tuple(
+            _output_entry(obj) for obj in objects if obj is not None
+        )
+
+    def submit(
+        self,
+        compute: Callable,
+        render: Callable | None = None,
+        message: str = "Computing...",
+        progress: widgets.Widget | None = None,
+    ) -> Future:
+        """
+        Run `compute` in the background and show its result when it is done.
+
+        Parameters:
+        compute (Callable): Function without arguments doing the heavy work.
+        Read every widget value before submitting, not inside it.
+        render (Callable): Turns the result into the objects to display, the
+        result itself (or each item of a returned list) is shown when omitted.
+        message (str): Status shown while the computation runs.
+        progress (widgets.Widget): Progress bar shown under the status, which
+        `compute` may update.
+
+        Returns:
+        Future: The future of the computation.
+        """
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            if self._future is not None:
+                self._future.cancel()
+            self.show(f"⏳ {message}", progress)
+            future = self._future = self.executor.submit(compute)
+        future.add_done_callback(partial(self._finish, generation, render))
+        return future
+
+    def cancel(self):
+        """
+        Drop the pending computation, if any, and clear the output.
+        """
+        with self._lock:
+            self._generation += 1
+            if self._future is not None:
+                self._future.cancel()
+            self._future = None
+        self.show()
+
+    def _finish(self, generation: int, render: Callable | None, future: Future):
+        if future.cancelled():
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            error = future.exception()
+            if error is not None:
+                self.show(f"Something went wrong: {error!r}")
+                return
+            try:
+                result = future.result()
+                objects = render(result) if render is not None else result
+                if not isinstance(objects, (list, tuple)):
+                    objects = [objects]
+                self.show(*objects)
+            except Exception as render_error:
+                self.show(f"Something went wrong: {render_error!r}")
+
+
+def debounce(wait: float):
+    """
+    Delay calls to the decorated function until `wait` seconds have passed
+    without a new call, so a burst of keystrokes triggers a single update
+    with the last arguments.
+
+    Parameters:
+    wait (float): Quiet period in seconds.
+    """
+
+    def decorator(function: Callable) -> Callable:
+        timer = None
+        lock = threading.Lock()
+
+        def debounced(*args, **kwargs):
+            nonlocal timer
+            with lock:
+                if timer is not None:
+                    timer.cancel()
+                timer = threading.Timer(wait, function, args, kwargs)
+                timer.daemon = True
+                timer.start()
+
+        return debounced
+
+    return decorator
@@ -0,0 +1,244 @@
+"""
+Benchmarks of the filtering, aggregation, frequency table and figure-build
+hot paths on synthetic IPUMS-shaped data.
+
+Runs without a notebook or widgets and prints (or writes) the timings as
+JSON, so runs on different commits can be compared:
+
+    python benchmarks/run_benchmarks.py --rows 1000000 --output before.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import types
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = "dataviz"
+
+# The package __init__ imports google.colab and mounts the drive, so the
+# modules are loaded through a bare package object pointing at the sources.
+_package = types.ModuleType(PACKAGE_NAME)
+_package.__path__ = [PACKAGE_DIR]
+sys.modules.setdefault(PACKAGE_NAME, _package)
+
+from dataviz import plotting, settings  # noqa: E402
+from dataviz.aggregation_cache import aggregation_cache  # noqa: E402
+from dataviz.describe_data import count_table_outputs  # noqa: E402
+from dataviz.filter_data import FilterEngine, filter_dataframe  # noqa: E402
+from dataviz.filter_data import filter_subset  # noqa: E402
+from dataviz.optimize_data import encode_categoricals  # noqa: E402
+from dataviz.profiling import profile_dataframe  # noqa: E402
+
+PLOT_KINDS = ["line", "area", "grouped bar", "scatter", "box", "stacked bar"]
+
+
+def make_extract(
+    rows: int, extra_columns: int = 0, cardinality: int = 500, seed: int = 0
+) -> pd.DataFrame:
+    """
+    Generate a person-level extract shaped like an IPUMS USA sample.
+
+    Parameters:
+    rows (int): Number of rows.
+    extra_columns (int): Number of additional integer code variables.
+    cardinality (int): Number of distinct codes of OCC and the extra variables.
+    seed (int): Seed of the random generator.
+
+    Returns:
+    pd.DataFrame: The synthetic extract, with int64/float64/object columns
+    like a freshly read CSV.
+    """
+    rng = np.random.default_rng(seed)
+    income = rng.lognormal(10, 1, rows).round()
+    # IPUMS codes N/A income as 9999999
+    income[rng.random(rows) < 0.1] = 9999999
+    data = {
+        "YEAR": rng.choice(np.arange(2000, 2023), rows),
+        "STATEFIP": rng.integers(1, 57, rows),
+        "SEX": rng.integers(1, 3, rows),
+        "AGE": rng.integers(0, 100, rows),
+        "RACE": rng.integers(1, 10, rows),
+        "EDUC": rng.integers(0, 12, rows),
+        "OCC": rng.integers(0, cardinality, rows),
+        "INCTOT": income,
+        "PERWT": rng.gamma(2.0, 50.0, rows).round(),
+        "METRO": rng.choice(["Not in metro", "Central city", "Suburb", "Mixed"], rows),
+    }
+    for i in range(extra_columns):
+        data[f"VAR{i}"] = rng.integers(0, cardinality, rows)
+    return pd.DataFrame(data)
+
+
+def time_call(function, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "repeat": repeat,
+    }
+
+
+def _quiet(function):
+    # filter_subset and parts of the plotting print their arguments
+    def call():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return function()
+
+    return call
+
+
+def _uncached_graph(data, kind, **kwargs):
+    def call():
+        aggregation_cache.clear()
+        return plotting.render_graph(data, kind, **kwargs)
+
+    return call
+
+
+def run_benchmarks(data: pd.DataFrame, repeat: int) -> dict:
+    """
+    Time every hot path on the extract.
+
+    Returns:
+    dict: Benchmark name -> min/median/mean seconds over `repeat` runs.
+    """
+    results = {}
+    results["profile"] = time_call(lambda: profile_dataframe(data), repeat)
+
+    # The session profile, as stored by run(); plotting and the tables
+    # read the numeric attributes from it
+    settings.profile = profile_dataframe(data)
+
+    selection = {
+        "SEX": [1],
+        "RACE": [1, 2, 3],
+        "STATEFIP": list(range(1, 30)),
+        "AGE": [[18, 65]],
+    }
+    discrete = {attribute: selection[attribute] for attribute in ("SEX", "RACE")}
+    results["filter_dataframe.cold"] = time_call(
+        lambda: FilterEngine(data).filter(selection), repeat
+    )
+    results["filter_dataframe.warm"] = time_call(
+        lambda: filter_dataframe(data, selection), repeat
+    )
+    results["filter_subset"] = time_call(
+        _quiet(lambda: filter_subset(data, discrete)), repeat
+    )
+
+    groups = [("SEX", [1]), ("SEX", [2]), ("RACE", [1, 2])]
+    for kind in PLOT_KINDS:
+        results[f"render_graph.{kind}"] = time_call(
+            _quiet(
+                _uncached_graph(
+                    data,
+                    kind,
+                    x_axis="YEAR" if kind != "scatter" else "AGE",
+                    y_axis="INCTOT" if kind != "stacked bar" else "RACE",
+                    groups=groups if kind in ("line", "area", "grouped bar") else [],
+                    grouping_type="cluster avg",
+                    filter_list=discrete,
+                )
+            ),
+            repeat,
+        )
+    results["render_graph.line.cached"] = time_call(
+        _quiet(
+            lambda: plotting.render_graph(
+                data,
+                "line",
+                x_axis="YEAR",
+                y_axis="INCTOT",
+                groups=groups,
+                grouping_type="cluster avg",
+                filter_list=discrete,
+            )
+        ),
+        repeat,
+    )
+
+    filtered = filter_dataframe(data, selection)
+    count_selection = {"SEX": [1, 2], "RACE": [1, 2, 3], "EDUC": [[0, 11]]}
+    results["count_table.pairwise"] = time_call(
+        lambda: count_table_outputs(filtered, count_selection), repeat
+    )
+    results["count_table.single"] = time_call(
+        lambda: count_table_outputs(filtered, {"OCC": [1, 2, 3]}), repeat
+    )
+    return results
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PACKAGE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--extra-columns", type=int, default=0)
+    parser.add_argument("--cardinality", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--categorical",
+        action="store_true",
+        help="dictionary-encode the code variables like run(encode_categories=...)",
+    )
+    parser.add_argument("--output", help="write the JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    data = make_extract(args.rows, args.extra_columns, args.cardinality, args.seed)
+    if args.categorical:
+        data = encode_categoricals(data, columns=["STATEFIP", "RACE", "OCC"])
+
+    report = {
+        "metadata": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "rows": args.rows,
+            "columns": len(data.columns),
+            "cardinality": args.cardinality,
+            "categorical": args.categorical,
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+        },
+        "results": run_benchmarks(data, args.repeat),
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import itertools
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .parallel import parallel_map
+
+
+def factorize_column(series: pd.Series) -> Tuple[np.ndarray, pd.Index]:
+    """
+    Encode a column as integer codes.
+
+    Parameters:
+    series (pd.Series): The column to encode.
+
+    Returns:
+    Tuple[np.ndarray, pd.Index]: The codes (-1 for missing values) and the
+    sorted values they refer to.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy().astype(np.intp), series.cat.categories
+    try:
+        codes, uniques = pd.factorize(series, sort=True)
+    except TypeError:
+        codes, uniques = pd.factorize(series)
+    return codes.astype(np.intp, copy=False), pd.Index(uniques)
+
+
+def factorize_columns(
+    df: pd.DataFrame, columns
+) -> Dict[str, Tuple[np.ndarray, pd.Index]]:
+    return {column: factorize_column(df[column]) for column in columns}
+
+
+def expected_values(values) -> list:
+    """
+    Expand the selected values of an attribute into the categories that a
+    frequency table should list, turning [start, end] ranges into every
+    integer of the closed interval.
+    """
+    expanded = []
+    for value in values:
+        if isinstance(value, (list, tuple)):
+            start, end = value
+            expanded.extend(range(int(start), int(end) + 1))
+        else:
+            expanded.append(value)
+    return expanded
+
+
+def contingency_counts(
+    codes_a: np.ndarray,
+    size_a: int,
+    codes_b: np.ndarray,
+    size_b: int,
+    weights: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Count the co-occurrences of two coded columns with a single bincount.
+
+    Returns:
+    np.ndarray: A (size_a, size_b) array of counts; rows with a missing value
+    in either column are left out.
+    """
+    valid = (codes_a >= 0) & (codes_b >= 0)
+    combined = codes_a[valid] * size_b + codes_b[valid]
+    counts = np.bincount(
+        combined,
+        weights=None if weights is None else weights[valid],
+        minlength=size_a * size_b,
+    )
+    return counts.reshape(size_a, size_b)
+
+
+_WEIGHTS = "__weights__"
+
+
+def _pair_counts(
+    arrays: dict, column_a: str, size_a: int, column_b: str, size_b: int, weighted
+) -> np.ndarray:
+    weights = arrays[_WEIGHTS] if weighted else None
+    return contingency_counts(
+        arrays[column_a], size_a, arrays[column_b], size_b, weights
+    )
+
+
+def _with_missing(observed: pd.Index, values) -> pd.Index:
+    missing = [value for value in expected_values(values) if value not in observed]
+    if not missing:
+        return observed
+    combined = observed.append(pd.Index(missing)).unique()
+    try:
+        return combined.sort_values()
+    except TypeError:
+        return combined
+
+
+def _table_from_counts(
+    counts: np.ndarray, index: pd.Index, columns: pd.Index, selections: dict, pair
+) -> pd.DataFrame:
+    # Keep only the categories present in the data, like groupby().unstack()
+    rows, cols = counts.sum(axis=1) > 0, counts.sum(axis=0) > 0
+    table = pd.DataFrame(
+        counts[np.ix_(rows, cols)], index=index[rows], columns=columns[cols]
+    )
+    table.index.name, table.columns.name = pair
+
+    # Selected categories without any rows are reindexed in one step, <NA>
+    # marks them so the counts keep an integer dtype
+    full_index = _with_missing(table.index, selections.get(pair[0], []))
+    full_columns = _with_missing(table.columns, selections.get(pair[1], []))
+    row_totals = table.sum(axis=1)
+    column_totals = table.sum(axis=0)
+    total = table.values.sum()
+
+    table = table.reindex(index=full_index, columns=full_columns)
+    table["Total"] = row_totals.reindex(full_index)
+    table.loc["Total"] = pd.concat(
+        [column_totals.reindex(full_columns), pd.Series({"Total": total})]
+    )
+    if pd.api.types.is_integer_dtype(row_totals.dtype):
+        table = table.astype("Int64")
+    table.index.name, table.columns.name = pair
+    return table
+
+
+def pairwise_count_tables(
+    df: pd.DataFrame,
+    selections: dict,
+    weights: np.ndarray | None = None,
+) -> List[pd.DataFrame]:
+    """
+    Build the frequency table of every pair of selected attributes.
+
+    Each column is factorized once and every pairwise table is computed with
+    a bincount on the combined codes.
+
+    Parameters:
+    df (pd.DataFrame): The filtered DataFrame.
+    selections (dict): The selections, whose keys are the attributes to cross.
+    weights (np.ndarray): Row weights, counts are unweighted when omitted.
+
+    Returns:
+    List[pd.DataFrame]: One table per pair, in itertools.combinations order,
+    with a "Total" row and column.
+    """
+    columns = list(selections.keys())
+    factorized = factorize_columns(df, columns)
+    pairs = list(itertools.combinations(columns, 2))
+
+    arrays = {column: codes for column, (codes, _) in factorized.items()}
+    if weights is not None:
+        arrays[_WEIGHTS] = np.asarray(weights, dtype=float)
+    tasks = [
+        (a, len(factorized[a][1]), b, len(factorized[b][1]), weights is not None)
+        for a, b in pairs
+    ]
+    # The pairs are independent, parallel_map may count them in worker processes
+    all_counts = parallel_map(_pair_counts, arrays, tasks)
+
+    return [
+        _table_from_counts(
+            counts, factorized[pair[0]][1], factorized[pair[1]][1], selections, pair
+        )
+        for pair, counts in zip(pairs, all_counts)
+    ]
+
+
+def value_count_table(
+    df: pd.DataFrame,
+    column: str,
+    values,
+    weights: np.ndarray | None = None,
+) -> pd.DataFrame:
+    """
+    Count the rows of each value of a single attribute.
+
+    Parameters:
+    df (pd.DataFrame): The filtered DataFrame.
+    column (str): The attribute to count.
+    values (list): The selected values, listed with <NA> when absent.
+    weights (np.ndarray): Row weights, counts are unweighted when omitted.
+
+    Returns:
+    pd.DataFrame: A table with the value and "Count" columns, sorted by count.
+    """
+    codes, uniques = factorize_column(df[column])
+    valid = codes >= 0
+    counts = np.bincount(
+        codes[valid],
+        weights=None if weights is None else weights[valid],
+        minlength=len(uniques),
+    )
+    counts = pd.Series(counts, index=uniques)
+    counts = counts[counts > 0].sort_values(ascending=False, kind="stable")
+
+    missing = [value for value in expected_values(values) if value not in counts.index]
+    counts = counts.reindex(counts.index.append(pd.Index(missing)).unique())
+    if weights is None:
+        counts = counts.astype("Int64")
+
+    table = counts.rename_axis(column).reset_index()
+    table.columns = [column, "Count"]
+    return table
+
+
+class ContingencyCube:
+    """
+    Sparse N-way frequency cube over factorized codes.
+
+    The rows are scanned once: every observed combination of the columns'
+    codes is stored in coordinate (COO) form with its count. Any 1-, 2- or
+    k-way marginal is then summed from the stored cells without touching the
+    rows again. Rows with a missing value in any of the columns are left out.
+    """
+
+    def __init__(self, df: pd.DataFrame, columns, weights: np.ndarray | None = None):
+        self.columns = list(columns)
+        factorized = factorize_columns(df, self.columns)
+        self.levels = [factorized[column][1] for column in self.columns]
+        self.shape = tuple(len(levels) for levels in self.levels)
+        if np.prod(self.shape, dtype=float) >= 2**62:
+            raise ValueError("Too many category combinations for a frequency cube.")
+
+        codes = [factorized[column][0] for column in self.columns]
+        valid = np.logical_and.reduce([c >= 0 for c in codes])
+        flat = np.ravel_multi_index([c[valid] for c in codes], self.shape)
+        keys, inverse = np.unique(flat, return_inverse=True)
+        counts = np.bincount(
+            inverse, weights=None if weights is None else weights[valid]
+        )
+
+        self.coords = np.array(np.unravel_index(keys, self.shape))
+        self.counts = counts
+
+    @property
+    def nnz(self) -> int:
+        """Number of stored (non-empty) cells."""
+        return len(self.counts)
+
+    def marginal(self, columns) -> pd.Series:
+        """
+        Sum the cube over every column not listed.
+
+        Parameters:
+        columns (list): The columns to keep, in the order of the result index.
+
+        Returns:
+        pd.Series: Counts indexed by the observed combinations of `columns`.
+        """
+        columns = list(columns)
+        if not columns:
+            return pd.Series([self.counts.sum()], index=["Total"], name="Count")
+
+        axes = [self.columns.index(column) for column in columns]
+        shape = tuple(self.shape[axis] for axis in axes)
+        flat = np.ravel_multi_index(self.coords[axes], shape)
+        keys, inverse = np.unique(flat, return_inverse=True)
+        counts = np.bincount(inverse, weights=self.counts)
+        if np.issubdtype(self.counts.dtype, np.integer):
+            counts = counts.astype(np.int64)
+
+        coords = np.unravel_index(keys, shape)
+        arrays = [self.levels[axis][c] for axis, c in zip(axes, coords)]
+        if len(arrays) == 1:
+            index = pd.Index(arrays[0], name=columns[0])
+        else:
+            index = pd.MultiIndex.from_arrays(arrays, names=columns)
+        return pd.Series(counts, index=index, name="Count")
+
+    def table(self, columns) -> pd.DataFrame:
+        """
+        Return a marginal as a long-format frequency table.
+        """
+        return self.marginal(columns).reset_index()
@@ -23,6 +23,7 @@ from google.colab import output, drive, files
 from .ui import make_selection_menu
 
 from .settings import *
+from . import settings
 
 drive.mount("/content/drive")
 
@@ -43,6 +44,8 @@ def numeric_selections(df: pd.DataFrame):
     # selections = {}
 
     temp_range_holder = None
+    profile = settings.profile
+    numerical_attributes = profile.numerical_attributes
 
     def create_attribute_dropdown():
         return widgets.Dropdown(
@@ -52,7 +55,7 @@ def numeric_selections(df: pd.DataFrame):
         )
 
     def create_value_slider(attribute):
-        min_value, max_value = df[attribute].min(), df[attribute].max()
+        min_value, max_value = profile[attribute].minimum, profile[attribute].maximum
         step_size = max(1, (max_value - min_value) // 20)
 
         return widgets.IntRangeSlider(
@@ -104,7 +107,7 @@ def numeric_selections(df: pd.DataFrame):
                 values.extend(
                     [
                         item
-                        for item in df[selected_attribute].unique()
+                        for item in profile[selected_attribute].values
                         if start <= item <= end and item not in values
                     ]
                 )
@@ -123,7 +126,7 @@ def numeric_selections(df: pd.DataFrame):
                 selections[selected_attribute] = sorted(
                     [
                         item
-                        for item in df[selected_attribute].unique()
+                        for item in profile[selected_attribute].values
                         if start <= item <= end
                     ]
                 )
@@ -1,76 +1,158 @@
-import itertools
 import pandas as pd
 from IPython.display import display, clear_output
 import ipywidgets as widgets
 
-from .export_data import download_excel
+from .crosstab import ContingencyCube, pairwise_count_tables, value_count_table
+from .export_data import EXPORT_FORMATS, download_excel, download_tables
+from .filter_data import FilteredView, materialize
 from .settings import *
-
-
-def count_table(filtered_df: pd.DataFrame, selections: dict):
+from .sketch import sketch_columns, sketch_summary
+from .variance import (
+    pairwise_standard_error_tables,
+    replicate_columns,
+    value_count_standard_errors,
+)
+from .weights import weight_array
+
+
+def _display_outputs(outputs: list):
+    for output in outputs:
+        if isinstance(output, str):
+            print(output)
+        else:
+            display(output)
+
+
+def count_table_outputs(
+    filtered_df: pd.DataFrame | FilteredView,
+    selections: dict,
+    weight: str | None = None,
+    standard_errors: bool = False,
+) -> list:
+    """
+    Build the frequency tables of the selected attributes and their download
+    button without displaying them.
+
+    Parameters:
+    filtered_df (pd.DataFrame | FilteredView): The filtered data.
+    selections (dict): The selected attributes and values.
+    weight (str): Weight column; the tables then hold weighted counts.
+    standard_errors (bool): Add the replicate-weight standard errors of the
+    weighted counts, as an "SE" column or an SE table after every table.
+
+    Returns:
+    list: The tables and buttons to display, in order.
+    """
+    if standard_errors and weight is None:
+        raise ValueError("Standard errors need a weight with replicate weights")
     columns = selections.keys()
-    count_tables = []
-
-    def create_count_table(pair):
-        count_table = filtered_df.groupby(list(pair)).size().unstack(fill_value=0)
-        count_table["Total"] = count_table.sum(axis=1)
-        count_table.loc["Total"] = count_table.sum(axis=0)
-        count_table.at["Total", "Total"] = count_table.values.sum()
-
-        count_table = count_table.astype(int)
-
-        for attribute, values in selections.items():
-            if not values or attribute not in pair:
-                continue
-
-            for value_range in values:
-                if type(value_range) in (tuple, list):
-                    start, end = value_range
-                    for value in range(start, end + 1):
-                        if value not in count_table.index:
-                            count_table.loc[value] = "NaN"
-                        if value not in count_table.columns:
-                            count_table[value] = "NaN"
-                else:
-                    value = value_range
-                    if value not in count_table.index:
-                        count_table.loc[value] = "NaN"
-                    if value not in count_table.columns:
-                        count_table[value] = "NaN"
-
-        return count_table
+    extra_columns = []
+    if weight:
+        extra_columns.append(weight)
+    if standard_errors:
+        extra_columns += replicate_columns(filtered_df.columns, weight)
+    filtered_df = materialize(filtered_df, [*columns, *extra_columns])
+    weights = weight_array(filtered_df, weight)
 
     if len(columns) > 1:
         # Display subsets of DataFrame for each combination of columns
-        for pair in itertools.combinations(columns, 2):
-            count_table = create_count_table(pair)
-            display(count_table)
-            count_tables.append(count_table)
-
+        count_tables = pairwise_count_tables(filtered_df, selections, weights)
+        if standard_errors:
+            error_tables = pairwise_standard_error_tables(
+                filtered_df, selections, count_tables, weight
+            )
+            count_tables = [
+                table for pair in zip(count_tables, error_tables) for table in pair
+            ]
+
+        file_format = widgets.Dropdown(options=EXPORT_FORMATS, description="Format:")
         download_button = widgets.Button(description="Download")
-        # download_button.on_click(lambda x: save_and_download_dataframes(count_tables))
-        download_button.on_click(lambda x: download_excel(count_table))
-        display(download_button)
+        # Every pairwise table goes to one workbook (a sheet per pair) or zip
+        download_button.on_click(
+            lambda x: download_tables(count_tables, file_format=file_format.value)
+        )
+        return [*count_tables, widgets.HBox([file_format, download_button])]
     elif len(columns) == 1:
+        outputs = []
         for column, values in selections.items():
-            value_counts_table = filtered_df[column].value_counts().reset_index()
-            value_counts_table.columns = [column, "Count"]
-
-            for value in values:
-                if value not in value_counts_table[column].values:
-                    value_counts_table = value_counts_table.append(
-                        {column: value, "Count": "NaN"}, ignore_index=True
-                    )
+            value_counts_table = value_count_table(filtered_df, column, values, weights)
+            if standard_errors:
+                value_counts_table = value_count_standard_errors(
+                    value_counts_table, filtered_df, column, weight
+                )
 
             download_button = widgets.Button(description="Download Table")
             download_button.on_click(lambda x: download_excel(value_counts_table))
 
-            display(value_counts_table, download_button)
+            outputs += [value_counts_table, download_button]
+        return outputs
     else:
-        print("Nothing selected")
-
-
-def head_exception(df: pd.DataFrame):
+        return ["Nothing selected"]
+
+
+def count_table(
+    filtered_df: pd.DataFrame | FilteredView,
+    selections: dict,
+    weight: str | None = None,
+    standard_errors: bool = False,
+):
+    _display_outputs(
+        count_table_outputs(filtered_df, selections, weight, standard_errors)
+    )
+
+
+def frequency_cube_outputs(
+    filtered_df: pd.DataFrame | FilteredView,
+    selections: dict,
+    weight: str | None = None,
+) -> list:
+    """
+    Build the frequency cube of the selected attributes and the widgets to
+    browse its marginal tables without displaying them.
+
+    Returns:
+    list: The summary line and the widgets to display, in order.
+    """
+    columns = list(selections.keys())
+    if not columns:
+        return ["Nothing selected"]
+
+    filtered_df = materialize(filtered_df, [*columns, *([weight] if weight else [])])
+    cube = ContingencyCube(filtered_df, columns, weight_array(filtered_df, weight))
+
+    dimensions = widgets.SelectMultiple(
+        options=columns, value=tuple(columns), description="Breakdown:"
+    )
+    show_button = widgets.Button(description="Show Table")
+    download_button = widgets.Button(description="Download")
+    output_widget = widgets.Output()
+
+    def show_table(button):
+        output_widget.clear_output(wait=True)
+        output_widget.append_display_data(cube.table(dimensions.value))
+
+    show_button.on_click(show_table)
+    download_button.on_click(lambda x: download_excel(cube.table(dimensions.value)))
+    show_table(show_button)
+
+    return [
+        f"Frequency cube over {columns}: {cube.nnz} non-empty cells",
+        dimensions,
+        show_button,
+        download_button,
+        output_widget,
+    ]
+
+
+def frequency_cube(
+    filtered_df: pd.DataFrame | FilteredView,
+    selections: dict,
+    weight: str | None = None,
+):
+    _display_outputs(frequency_cube_outputs(filtered_df, selections, weight))
+
+
+def head_exception(df: pd.DataFrame | FilteredView):
     try:
         first_k_lines = int(input("How many lines do you want to check? "))
         display(df.head(int(first_k_lines)))
@@ -82,15 +164,47 @@ def head_exception(df: pd.DataFrame):
         print("--" * 20)
 
 
-def summary_statistics(df: pd.DataFrame):
-    print("Numeric Attribtues are:")
-    print(numerical_attributes)
-
-    print("--" * 20)
-    print("Summary statistics:")
-
+def summary_statistics_outputs(
+    df: pd.DataFrame | FilteredView,
+    approximate: bool = False,
+    weight: str | None = None,
+) -> list:
+    """
+    Build the summary statistics of the numeric attributes without
+    displaying them.
+
+    Parameters:
+    df (pd.DataFrame | FilteredView): The (filtered) data.
+    approximate (bool): Estimate the quartiles with quantile sketches built
+    in one chunked pass, instead of sorting every column in full.
+    weight (str): Weight column; weighted statistics always use sketches.
+
+    Returns:
+    list: The lines and the summary table to display, in order.
+    """
     pd.options.display.float_format = "{:,.0f}".format
+    columns = numerical_columns()
 
-    summary_df = df[numerical_attributes].describe().transpose()
-
-    display(summary_df)
+    if approximate or weight is not None:
+        summary_df = sketch_summary(sketch_columns(df, columns, weight))
+        title = "Summary statistics (approximate quartiles"
+        title += f", weighted by {weight}):" if weight else "):"
+    else:
+        summary_df = materialize(df, columns).describe().transpose()
+        title = "Summary statistics:"
+
+    return [
+        "Numeric Attribtues are:",
+        str(columns),
+        "--" * 20,
+        title,
+        summary_df,
+    ]
+
+
+def summary_statistics(
+    df: pd.DataFrame | FilteredView,
+    approximate: bool = False,
+    weight: str | None = None,
+):
+    _display_outputs(summary_statistics_outputs(df, approximate, weight))
@@ -1,8 +1,253 @@
+import atexit
+import gzip
+import io
 import os
+import shutil
+import tempfile
+import zipfile
+from typing import Callable, Iterable, Iterator, List, Union
+
+import numpy as np
 import pandas as pd
-from google.colab import files
+from .filter_data import FilteredView
 from .settings import *
 
+# Excel limits sheet names to 31 characters.
+MAX_SHEET_NAME = 31
+
+EXPORT_FORMATS = ("xlsx", "parquet", "csv")
+
+ROW_EXPORT_FORMATS = ("csv.gz", "csv.zst", "parquet")
+
+# Rows gathered and written at a time by export_rows; also the Parquet row
+# group size.
+EXPORT_CHUNK_ROWS = 500_000
+
+
+class ColabDownloadSink:
+    """
+    Sends exported files to the browser through google.colab.files.
+    """
+
+    def __call__(self, path: str):
+        # Imported here so the module also loads outside Colab
+        from google.colab import files
+
+        files.download(path)
+
+
+class LocalFileSink:
+    """
+    Keeps exported files on the local disk, copied into `directory`.
+    """
+
+    def __init__(self, directory: str = "."):
+        self.directory = directory
+
+    def __call__(self, path: str):
+        os.makedirs(self.directory, exist_ok=True)
+        target = os.path.join(self.directory, os.path.basename(path))
+        if os.path.abspath(target) != os.path.abspath(path):
+            shutil.copyfile(path, target)
+        print(f"Saved to: {os.path.abspath(target)}")
+
+
+_download_sink = None
+
+
+def set_download_sink(sink: Callable[[str], None] | None):
+    """
+    Choose where exported files go. Any callable taking the file path works;
+    None restores the default (the browser in Colab, the working directory
+    elsewhere).
+    """
+    global _download_sink
+    _download_sink = sink
+
+
+def get_download_sink() -> Callable[[str], None]:
+    if _download_sink is not None:
+        return _download_sink
+    try:
+        import google.colab  # noqa: F401
+    except ImportError:
+        return LocalFileSink()
+    return ColabDownloadSink()
+
+
+def download_file(path: str):
+    get_download_sink()(path)
+
+
+def _sheet_name(table: pd.DataFrame, position: int, used: set) -> str:
+    names = [table.index.name, table.columns.name]
+    if all(names):
+        name = " x ".join(str(n) for n in names)
+    else:
+        name = f"Table {position + 1}"
+    # Characters Excel rejects in sheet names
+    for character in "[]:*?/\\":
+        name = name.replace(character, "_")
+    name = name[:MAX_SHEET_NAME]
+
+    base, suffix = name, 2
+    while name.lower() in used:
+        tag = f" ({suffix})"
+        name = base[: MAX_SHEET_NAME - len(tag)] + tag
+        suffix += 1
+    used.add(name.lower())
+    return name
+
+
+def _cell(value):
+    if value is pd.NA or value is None:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if isinstance(value, (int, float, str, bool)):
+        return value
+    return str(value)
+
+
+def _table_rows(table: pd.DataFrame) -> Iterator[list]:
+    # Row-major: the constant-memory writer only accepts increasing rows
+    index_names = [name or "" for name in table.index.names]
+    yield [*map(_cell, index_names), *map(_cell, table.columns)]
+    labels = table.index.to_list()
+    for label, row in zip(labels, table.itertuples(index=False, name=None)):
+        label = label if isinstance(label, tuple) else (label,)
+        yield [*map(_cell, label), *map(_cell, row)]
+
+
+def write_workbook(tables: List[pd.DataFrame], path: str) -> str:
+    """
+    Write every table to its own sheet of a single Excel workbook.
+
+    With xlsxwriter installed the rows are streamed in constant-memory mode,
+    so only the row being written is held by the writer; otherwise pandas'
+    default Excel engine is used.
+
+    Parameters:
+    tables (list[pd.DataFrame]): The tables, one sheet each.
+    path (str): Path of the .xlsx file.
+
+    Returns:
+    str: The path of the workbook.
+    """
+    used = set()
+    try:
+        import xlsxwriter
+    except ImportError:
+        with pd.ExcelWriter(path) as writer:
+            for position, table in enumerate(tables):
+                table.to_excel(writer, sheet_name=_sheet_name(table, position, used))
+        return path
+
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    try:
+        for position, table in enumerate(tables):
+            worksheet = workbook.add_worksheet(_sheet_name(table, position, used))
+            for row_number, row in enumerate(_table_rows(table)):
+                worksheet.write_row(row_number, 0, row)
+    finally:
+        workbook.close()
+    return path
+
+
+def _flat_table(table: pd.DataFrame) -> pd.DataFrame:
+    # Parquet needs string column names and an index of a single type, and
+    # the "Total" row mixes a string into the category labels
+    flat = table.reset_index()
+    flat.columns = [str(column) for column in flat.columns]
+    for column in flat.columns[: table.index.nlevels]:
+        flat[column] = flat[column].map(lambda value: _cell(value)).astype("string")
+    return flat
+
+
+def write_table_files(
+    tables: List[pd.DataFrame], directory: str, file_format: str = "parquet"
+) -> List[str]:
+    """
+    Write every table to its own Parquet or CSV file in `directory`.
+
+    Returns:
+    list[str]: The paths of the files, in the order of `tables`.
+    """
+    paths = []
+    used = set()
+    for position, table in enumerate(tables):
+        name = _sheet_name(table, position, used).replace(" ", "_")
+        path = os.path.join(directory, f"{name}.{file_format}")
+        if file_format == "parquet":
+            _flat_table(table).to_parquet(path, index=False)
+        else:
+            table.to_csv(path)
+        paths.append(path)
+    return paths
+
+
+def zip_files(paths: List[str], zip_path: str) -> str:
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for path in paths:
+            archive.write(path, arcname=os.path.basename(path))
+    return zip_path
+
+
+def export_tables(
+    tables: List[pd.DataFrame],
+    name: str = "Frequency Tables",
+    file_format: str = "xlsx",
+    directory: str | None = None,
+) -> str:
+    """
+    Export the tables as one file: an Excel workbook with a sheet per table,
+    or a zip archive of one Parquet/CSV file per table.
+
+    Parameters:
+    tables (list[pd.DataFrame]): The tables to export.
+    name (str): File name without extension.
+    file_format (str): "xlsx", "parquet" or "csv".
+    directory (str): Where the file is written, created when missing; a new
+    temporary directory (left to the caller to remove) when omitted.
+
+    Returns:
+    str: The path of the exported file.
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(
+            f"Unknown export format {file_format!r}, expected one of {EXPORT_FORMATS}"
+        )
+    if directory is None:
+        directory = tempfile.mkdtemp(prefix="dataviz-export-")
+    else:
+        os.makedirs(directory, exist_ok=True)
+
+    if file_format == "xlsx":
+        return write_workbook(tables, os.path.join(directory, f"{name}.xlsx"))
+
+    with tempfile.TemporaryDirectory() as staging:
+        paths = write_table_files(tables, staging, file_format)
+        return zip_files(paths, os.path.join(directory, f"{name}.zip"))
+
+
+def download_tables(
+    tables: List[pd.DataFrame],
+    name: str = "Frequency Tables",
+    file_format: str = "xlsx",
+):
+    """
+    Export the tables with export_tables and hand the file to the download
+    sink. The file is removed once the sink has taken it.
+    """
+    with tempfile.TemporaryDirectory(prefix="dataviz-export-") as directory:
+        download_file(
+            export_tables(
+                tables, name=name, file_format=file_format, directory=directory
+            )
+        )
+
 
 def download_excel(table: pd.DataFrame):
     """
@@ -11,29 +256,181 @@ def download_excel(table: pd.DataFrame):
     Parameters
     table (pd.DataFrame): The table to be downloaded
     """
-    table.to_excel("Frequency Table.xlsx", index=True)
-    files.download("Frequency Table.xlsx")
+    download_tables([table], name="Frequency Table")
 
 
-def save_and_download_dataframes(dataframes: list[pd.DataFrame], folder_name="output"):
+def save_and_download_dataframes(
+    dataframes: list[pd.DataFrame], folder_name="output", file_format="xlsx"
+):
     """
-    Save and download the dataframes as Excel files
+    Save and download the dataframes as a single workbook (one sheet per
+    dataframe), or as a zip of Parquet/CSV files
 
     Parameters
     dataframes (list[pd.DataFrame]): The dataframes to be saved
-    folder_name (str): The name of the folder where the Excel files will be saved
+    folder_name (str): The name of the folder where the export will be saved
+    file_format (str): "xlsx", "parquet" or "csv"
     """
-    # Create the folder if it doesn't exist
     os.makedirs(folder_name, exist_ok=True)
+    path = export_tables(
+        dataframes, name="data", file_format=file_format, directory=folder_name
+    )
+    print(f"Tables saved to: {path}")
+    download_file(path)
+
 
-    for i, df in enumerate(dataframes):
-        file_path = os.path.join(folder_name, f"data_{i + 1}.xlsx")
-        df.to_excel(file_path, index=True)
-        print(f"Table {i + 1} saved to: {file_path}")
+_row_export_directory = None
+
+
+def row_export_path(file_format: str, name: str = "filtered_data") -> str:
+    """
+    Return a path to export rows to, in a temporary directory shared by all
+    row exports of the session. The previous export is deleted first, so
+    repeated exports of a large selection don't fill the disk; the
+    directory itself is removed when the interpreter exits.
+    """
+    global _row_export_directory
+    if _row_export_directory is None or not os.path.isdir(_row_export_directory):
+        _row_export_directory = tempfile.mkdtemp(prefix="dataviz-export-")
+        atexit.register(shutil.rmtree, _row_export_directory, ignore_errors=True)
+    for entry in os.listdir(_row_export_directory):
+        os.remove(os.path.join(_row_export_directory, entry))
+    return os.path.join(_row_export_directory, f"{name}.{file_format}")
+
+
+def _print_progress(written: int, total: int):
+    end = "\n" if written == total else "\r"
+    print(f"Exported {written:,} of {total:,} rows", end=end)
+
+
+def _open_text(path: str, file_format: str):
+    if file_format == "csv.gz":
+        return gzip.open(path, "wt", newline="", compresslevel=6)
+    try:
+        import zstandard
+    except ImportError as error:
+        raise ImportError(
+            "zstd-compressed CSV export requires zstandard: pip install zstandard"
+        ) from error
+    compressed = zstandard.ZstdCompressor(level=3).stream_writer(open(path, "wb"))
+    return io.TextIOWrapper(compressed, encoding="utf-8", newline="")
+
+
+def _parquet_schema(source: pd.DataFrame, columns: List[str]):
+    # Fixed before the first chunk is written: an object column that is all
+    # missing in that chunk would otherwise be typed null and reject the
+    # values of later chunks. Object columns are typed from all their values,
+    # as strings when they are all missing; columns mixing unrelated types
+    # are written as text
+    import pyarrow as pa
+
+    schema = pa.Schema.from_pandas(source.iloc[:0][columns], preserve_index=False)
+    as_text = []
+    for position, column in enumerate(columns):
+        if source[column].dtype != object:
+            continue
+        values = source[column].to_numpy()
+        kind = pd.api.types.infer_dtype(values, skipna=True)
+        if kind == "empty":
+            value_type = pa.string()
+        elif kind == "mixed-integer-float":
+            value_type = pa.float64()
+        elif kind.startswith("mixed"):
+            value_type = None
+        else:
+            try:
+                value_type = pa.infer_type(values, from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                value_type = None
+        if value_type is None:
+            as_text.append(column)
+            value_type = pa.string()
+        schema = schema.set(position, pa.field(str(column), value_type))
+    return schema, as_text
+
+
+def _write_parquet(
+    chunks: Iterator[pd.DataFrame],
+    path: str,
+    source: pd.DataFrame,
+    columns: List[str],
+    progress,
+    total: int,
+):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as error:
+        raise ImportError(
+            "Parquet export requires pyarrow: pip install pyarrow"
+        ) from error
+
+    schema, as_text = _parquet_schema(source, columns)
+    written = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for chunk in chunks:
+            for column in as_text:
+                chunk = chunk.assign(
+                    **{column: chunk[column].map(str, na_action="ignore")}
+                )
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            # One row group per chunk
+            writer.write_table(table)
+            written += len(chunk)
+            progress(written, total)
+
+
+def export_rows(
+    data: Union[pd.DataFrame, FilteredView],
+    path: str,
+    columns: Iterable[str] | None = None,
+    file_format: str = "csv.gz",
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+    progress: Callable[[int, int], None] | None = _print_progress,
+) -> str:
+    """
+    Write the rows of a (filtered) DataFrame to a compressed CSV or a Parquet
+    file, `chunk_rows` rows at a time.
+
+    Only one chunk of the selected columns is materialized at any time, so
+    memory use does not grow with the number of exported rows.
+
+    Parameters:
+    data (pd.DataFrame | FilteredView): The rows to export.
+    path (str): Path of the output file.
+    columns (list): Columns to export, every column when omitted.
+    file_format (str): "csv.gz", "csv.zst" or "parquet".
+    chunk_rows (int): Rows per chunk (and per Parquet row group).
+    progress (Callable): Called with the rows written so far and the total
+    after every chunk; None disables the progress report.
+
+    Returns:
+    str: The path of the written file.
+    """
+    if file_format not in ROW_EXPORT_FORMATS:
+        raise ValueError(
+            f"Unknown export format {file_format!r}, expected one of "
+            f"{ROW_EXPORT_FORMATS}"
+        )
+    view = data if isinstance(data, FilteredView) else FilteredView(data)
+    columns = list(view.columns if columns is None else columns)
+    total = len(view)
+    chunks = view.iter_chunks(columns, chunk_rows=chunk_rows)
+    if not total:
+        # Still write the header / schema of an empty selection
+        chunks = iter([view.dataframe.iloc[:0][columns]])
+    progress = progress or (lambda written, total: None)
 
-    # Create a zip file containing all Excel files
-    zip_path = f"{folder_name}.zip"
-    os.system(f"zip -r {zip_path} {folder_name}")
+    if file_format == "parquet":
+        _write_parquet(chunks, path, view.dataframe, columns, progress, total)
+        return path
 
-    # Download the zip file
-    files.download(zip_path)
+    written = 0
+    with _open_text(path, file_format) as file:
+        header = True
+        for chunk in chunks:
+            chunk.to_csv(file, header=header, index=False)
+            header = False
+            written += len(chunk)
+            progress(written, total)
+    return path
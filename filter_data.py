@@ -1,29 +1,469 @@
+from collections import OrderedDict
 from functools import reduce
-from typing import Dict, Union
+from typing import Dict, Iterable, Iterator, Union
+import numpy as np
 import pandas as pd
 
 from .settings import *
 
+# Number of per-predicate masks kept by a FilterEngine.
+MAX_CACHED_MASKS = 64
+
+
+def is_range_selection(values) -> bool:
+    """
+    Whether the selected values are [start, end] ranges (numeric selections)
+    rather than a list of discrete values.
+    """
+    return bool(values) and all(isinstance(v, (list, tuple)) for v in values)
+
+
+class SortedColumnIndex:
+    """
+    Sorted view of a numeric column for resolving range predicates.
+
+    Rows are argsorted once; a [start, end] range then maps to a contiguous
+    slice of the sorted order found with two binary searches.
+    """
+
+    def __init__(self, column: pd.Series):
+        values = column.to_numpy()
+        self.order = np.argsort(values, kind="stable")
+        self.sorted_values = values[self.order]
+
+    @staticmethod
+    def supports(column: pd.Series) -> bool:
+        return isinstance(column.dtype, np.dtype) and column.dtype.kind in "iuf"
+
+    def slice(self, start, end) -> slice:
+        low = np.searchsorted(self.sorted_values, start, side="left")
+        high = np.searchsorted(self.sorted_values, end, side="right")
+        return slice(low, high)
+
+    def positions(self, ranges) -> np.ndarray:
+        """
+        Return the row positions falling in any of the closed ranges.
+
+        Parameters:
+        ranges (list): List of [start, end] pairs.
+
+        Returns:
+        np.ndarray: Row positions, unordered and without duplicates.
+        """
+        merged = []
+        for start, end in sorted(tuple(r) for r in ranges):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+
+        slices = [self.slice(start, end) for start, end in merged]
+        if len(slices) == 1:
+            return self.order[slices[0]]
+        return np.concatenate([self.order[s] for s in slices])
+
+
+class FilterEngine:
+    """
+    Compiles a selections dict into a single boolean row mask.
+
+    Each (attribute, values) predicate is evaluated once into a boolean array
+    and cached, so changing one attribute reuses the masks of the others and
+    only the final result is materialized.
+    """
+
+    def __init__(
+        self,
+        dataframe: pd.DataFrame,
+        max_cached_masks=MAX_CACHED_MASKS,
+        use_range_index=True,
+    ):
+        self.dataframe = dataframe
+        self.max_cached_masks = max_cached_masks
+        self.use_range_index = use_range_index
+        self._masks = OrderedDict()
+        self._range_indexes = {}
+
+    def range_index(self, attribute: str) -> SortedColumnIndex | None:
+        """
+        Return the sorted index of a numeric column, building it on first use.
+        None is returned for columns the index does not support.
+        """
+        if attribute not in self._range_indexes:
+            column = self.dataframe[attribute]
+            self._range_indexes[attribute] = (
+                SortedColumnIndex(column)
+                if SortedColumnIndex.supports(column)
+                else None
+            )
+        return self._range_indexes[attribute]
+
+    def range_positions(self, attribute: str, ranges) -> np.ndarray:
+        """
+        Return the row positions matching a list of [start, end] ranges.
+        """
+        index = self.range_index(attribute)
+        if index is None:
+            return np.flatnonzero(self._evaluate(attribute, ranges))
+        return index.positions(ranges)
+
+    @staticmethod
+    def predicate_key(attribute: str, values) -> tuple:
+        if is_range_selection(values):
+            return attribute, "range", tuple(sorted(tuple(v) for v in values))
+        return attribute, "isin", frozenset(values)
+
+    @staticmethod
+    def _evaluate_codes(column: pd.Series, values) -> np.ndarray:
+        # Resolve the predicate on the categories, then look the codes up
+        categories = column.cat.categories
+        if is_range_selection(values):
+            keep = np.zeros(len(categories), dtype=bool)
+            for start, end in values:
+                keep |= (categories >= start) & (categories <= end)
+        else:
+            keep = categories.isin(list(values))
+        # Missing values have code -1, which picks the trailing entry
+        lookup = np.append(keep, not is_range_selection(values) and "nan" in values)
+        return lookup[column.cat.codes.to_numpy()]
+
+    def _evaluate(self, attribute: str, values) -> np.ndarray:
+        column = self.dataframe[attribute]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            return self._evaluate_codes(column, values)
+
+        if is_range_selection(values):
+            mask = np.zeros(len(column), dtype=bool)
+            index = self.range_index(attribute) if self.use_range_index else None
+            if index is not None:
+                mask[index.positions(values)] = True
+                return mask
+            for start, end in values:
+                mask |= ((column >= start) & (column <= end)).to_numpy()
+            return mask
+
+        values = list(values)
+        mask = column.isin(values).to_numpy()
+        if "nan" in values:
+            mask |= column.isna().to_numpy()
+        return mask
+
+    def predicate_mask(self, attribute: str, values) -> np.ndarray:
+        """
+        Return the cached boolean mask of rows matching one predicate.
+
+        Parameters:
+        attribute (str): The column to filter on.
+        values (list): Selected values, or a list of [start, end] ranges.
+
+        Returns:
+        np.ndarray: Boolean mask aligned with the DataFrame rows.
+        """
+        if isinstance(values, str):
+            values = [values]
+        key = self.predicate_key(attribute, values)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = self._evaluate(attribute, values)
+            self._masks[key] = mask
+            if len(self._masks) > self.max_cached_masks:
+                self._masks.popitem(last=False)
+        else:
+            self._masks.move_to_end(key)
+        return mask
+
+    def compile(self, selection: dict) -> np.ndarray:
+        """
+        Combine the masks of every selected attribute with a logical AND.
+
+        Parameters:
+        selection (dict): Mapping of attribute to selected values or ranges.
+
+        Returns:
+        np.ndarray: Boolean mask of the rows kept by the selection.
+        """
+        mask = np.ones(len(self.dataframe), dtype=bool)
+        for attribute, values in selection.items():
+            mask &= self.predicate_mask(attribute, values)
+        return mask
+
+    def filter(self, selection: dict) -> pd.DataFrame:
+        return self.dataframe[self.compile(selection)]
+
+    def view(self, selection: dict) -> "FilteredView":
+        return FilteredView(self.dataframe, self.compile(selection))
+
+
+# Rows materialized per chunk by FilteredView.iter_chunks.
+VIEW_CHUNK_ROWS = 1_000_000
+
+
+class FilteredView:
+    """
+    Lazy row selection of a DataFrame.
+
+    Holds the source frame, a boolean row mask and an optional column
+    projection. Nothing is copied until a consumer asks for columns, and then
+    only those columns are gathered, so the cost of a selection is
+    proportional to the columns a plot or table actually reads.
+
+    Attributes:
+    dataframe (pd.DataFrame): The unfiltered source frame.
+    mask (np.ndarray): Boolean mask of the kept rows.
+    """
+
+    def __init__(
+        self,
+        dataframe: pd.DataFrame,
+        mask: np.ndarray | None = None,
+        columns: Iterable[str] | None = None,
+    ):
+        self.dataframe = dataframe
+        self.mask = np.ones(len(dataframe), dtype=bool) if mask is None else mask
+        self._columns = None if columns is None else list(columns)
+        self._positions = None
+        self._materialized = {}
+
+    @property
+    def columns(self) -> pd.Index:
+        if self._columns is None:
+            return self.dataframe.columns
+        return pd.Index(self._columns)
+
+    @property
+    def positions(self) -> np.ndarray:
+        if self._positions is None:
+            self._positions = np.flatnonzero(self.mask)
+        return self._positions
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __contains__(self, column) -> bool:
+        return column in self.columns
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.column(key)
+        return self.to_frame(key)
+
+    def column(self, column: str) -> pd.Series:
+        """
+        Return one filtered column, gathering it on first access.
+        """
+        if column not in self.columns:
+            raise KeyError(column)
+        series = self._materialized.get(column)
+        if series is None:
+            series = self.dataframe[column].take(self.positions)
+            self._materialized[column] = series
+        return series
+
+    def select(self, columns: Iterable[str]) -> "FilteredView":
+        """
+        Return a view of the same rows projected to `columns`.
+        """
+        columns = list(dict.fromkeys(columns))
+        missing = set(columns).difference(self.columns)
+        if missing:
+            raise KeyError(f"Columns not in the view: {sorted(missing)}")
+        view = FilteredView(self.dataframe, self.mask, columns)
+        view._positions = self._positions
+        return view
+
+    def where(self, mask: np.ndarray) -> "FilteredView":
+        """
+        Return a view keeping only the rows that also match `mask`.
+        """
+        return FilteredView(self.dataframe, self.mask & mask, self._columns)
+
+    def to_frame(self, columns: Iterable[str] | None = None) -> pd.DataFrame:
+        """
+        Materialize the view, or only some of its columns.
+
+        Parameters:
+        columns (list): Columns to gather, every projected column when omitted.
+
+        Returns:
+        pd.DataFrame: The filtered rows of the requested columns.
+        """
+        columns = self.columns if columns is None else list(dict.fromkeys(columns))
+        return pd.DataFrame({column: self.column(column) for column in columns})
+
+    def _gather(self, positions: np.ndarray, columns: list) -> pd.DataFrame:
+        # Column by column: taking rows of the frame first would copy every
+        # column of a consolidated block, not only the requested ones
+        data = {}
+        for column in columns:
+            values = self.dataframe[column]._values
+            if isinstance(values, np.ndarray):
+                data[column] = values[positions]
+            else:
+                data[column] = values.take(positions)
+        index = self.dataframe.index
+        if isinstance(index, pd.RangeIndex):
+            # Indexing a RangeIndex would materialize (and cache) all labels
+            index = pd.Index(index.start + positions * index.step)
+        else:
+            index = index[positions]
+        return pd.DataFrame(data, index=index)
+
+    def head(self, n: int = 5) -> pd.DataFrame:
+        return self._gather(self.positions[:n], list(self.columns))
+
+    def iter_chunks(
+        self,
+        columns: Iterable[str] | None = None,
+        chunk_rows: int = VIEW_CHUNK_ROWS,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Materialize the view `chunk_rows` rows at a time, e.g. for exports.
+        """
+        columns = list(self.columns if columns is None else columns)
+        for start in range(0, len(self), chunk_rows):
+            yield self._gather(self.positions[start : start + chunk_rows], columns)
+
+
+def materialize(
+    data: Union[pd.DataFrame, FilteredView], columns: Iterable[str]
+) -> pd.DataFrame:
+    """
+    Return only `columns` of a DataFrame or a FilteredView as a DataFrame.
+
+    Parameters:
+    data (pd.DataFrame | FilteredView): The (filtered) data.
+    columns (list): Columns the caller reads.
+
+    Returns:
+    pd.DataFrame: The requested columns.
+    """
+    columns = [column for column in dict.fromkeys(columns) if column in data.columns]
+    if isinstance(data, FilteredView):
+        return data.to_frame(columns)
+    return data[columns]
+
+
+_engine = None
+
+
+def get_filter_engine(dataframe: pd.DataFrame) -> FilterEngine:
+    """
+    Return the FilterEngine of the DataFrame, creating a new one (and dropping
+    the cached masks) when a different DataFrame is passed.
+    """
+    global _engine
+    if _engine is None or _engine.dataframe is not dataframe:
+        _engine = FilterEngine(dataframe)
+    return _engine
+
 
 def filter_dataframe(dataframe: pd.DataFrame, selection: dict) -> pd.DataFrame:
-    filtered_df = dataframe.copy()  # Start with a copy of the original DataFrame
-
-    for attribute, values in selection.items():
-        if attribute is categorical_attributes and all(
-            isinstance(v, list) for v in values
-        ):
-            filter_condition = pd.Series(False, index=filtered_df.index)
-            for range in values:
-                start, end = range
-
-                filter_condition |= (filtered_df[attribute] >= start) & (
-                    filtered_df[attribute] <= end
-                )
-            filtered_df = filtered_df[filter_condition]
+    return get_filter_engine(dataframe).filter(selection)
+
+
+def filter_view(dataframe: pd.DataFrame, selection: dict) -> FilteredView:
+    return get_filter_engine(dataframe).view(selection)
+
+
+def _value_key(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+class IncrementalFilter:
+    """
+    Keeps a filtered DataFrame in sync with a selections dict that is edited
+    in place by the selection menus.
+
+    Every call compares the selections with the previous snapshot. Values
+    appended to an attribute are ORed into that attribute's mask, removed
+    attributes are dropped, and the combined mask is rebuilt from the cached
+    per-attribute masks only when something changed.
+    """
+
+    def __init__(self, engine: FilterEngine):
+        self.engine = engine
+        self._snapshot = {}
+        self._attribute_masks = {}
+        self._mask = None
+        self._filtered = None
+
+    def _update_attribute(self, attribute: str, values: list) -> bool:
+        previous = self._snapshot.get(attribute)
+        if previous == values:
+            return False
+
+        current_keys = {_value_key(v) for v in values}
+        if previous and all(_value_key(v) in current_keys for v in previous):
+            previous_keys = {_value_key(v) for v in previous}
+            added = [v for v in values if _value_key(v) not in previous_keys]
+            mask = self._attribute_masks[attribute] | self.engine.predicate_mask(
+                attribute, added
+            )
         else:
-            filtered_df = filtered_df[filtered_df[attribute].isin(values)]
+            mask = self.engine.predicate_mask(attribute, values)
+
+        self._attribute_masks[attribute] = mask
+        self._snapshot[attribute] = list(values)
+        return True
+
+    def update(self, selection: dict) -> np.ndarray:
+        """
+        Apply the changes since the last call and return the combined mask.
+
+        Parameters:
+        selection (dict): Mapping of attribute to selected values or ranges.
+
+        Returns:
+        np.ndarray: Boolean mask of the rows kept by the selection.
+        """
+        changed = self._mask is None
+        for attribute in set(self._snapshot).difference(selection):
+            del self._snapshot[attribute]
+            del self._attribute_masks[attribute]
+            changed = True
+
+        for attribute, values in selection.items():
+            changed |= self._update_attribute(attribute, list(values))
+
+        if changed:
+            self._mask = reduce(
+                np.logical_and,
+                self._attribute_masks.values(),
+                np.ones(len(self.engine.dataframe), dtype=bool),
+            )
+            self._filtered = None
+        return self._mask
+
+    def filter(self, selection: dict) -> pd.DataFrame:
+        mask = self.update(selection)
+        if self._filtered is None:
+            self._filtered = self.engine.dataframe[mask]
+        return self._filtered
+
+    def view(self, selection: dict) -> FilteredView:
+        """
+        Return the current selection as a FilteredView instead of a copy.
+        """
+        return FilteredView(self.engine.dataframe, self.update(selection))
+
+
+_incremental_filter = None
+
 
-    return filtered_df
+def get_incremental_filter(dataframe: pd.DataFrame) -> IncrementalFilter:
+    """
+    Return the IncrementalFilter of the DataFrame, sharing the predicate
+    masks cached by its FilterEngine.
+    """
+    global _incremental_filter
+    engine = get_filter_engine(dataframe)
+    if _incremental_filter is None or _incremental_filter.engine is not engine:
+        _incremental_filter = IncrementalFilter(engine)
+    return _incremental_filter
 
 
 def and_filter_subset(
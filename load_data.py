@@ -0,0 +1,120 @@
+import os
+from typing import Iterator, List
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from .optimize_data import downcast_dataframe, encode_column
+
+# Rows read per chunk by load_extract_chunked.
+LOAD_CHUNK_ROWS = 500_000
+
+
+def iter_extract_chunks(
+    path: str,
+    columns: List[str] | None = None,
+    ddi=None,
+    chunksize: int = LOAD_CHUNK_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """
+    Read an IPUMS extract chunk by chunk, keeping only the requested columns.
+
+    Fixed-width extracts (.dat/.dat.gz) are read through ipumspy and need the
+    DDI codebook of the extract. CSV extracts (optionally compressed) are read
+    with pandas.
+
+    Parameters:
+    path (str): Path of the data file.
+    columns (list): Columns to keep, every column when omitted.
+    ddi (str | ipumspy Codebook): The DDI codebook or the path of its xml file.
+    chunksize (int): Number of rows per chunk.
+
+    Returns:
+    Iterator[pd.DataFrame]: The chunks of the extract.
+    """
+    if ddi is not None:
+        try:
+            from ipumspy import readers
+        except ImportError as error:
+            raise ImportError(
+                "Reading fixed-width IPUMS extracts requires ipumspy: "
+                "pip install ipumspy"
+            ) from error
+
+        if isinstance(ddi, (str, os.PathLike)):
+            ddi = readers.read_ipums_ddi(ddi)
+        yield from readers.read_microdata_chunked(
+            ddi, filename=path, subset=columns, chunksize=chunksize
+        )
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+
+
+def _compact_chunk(chunk: pd.DataFrame, categorize: bool) -> pd.DataFrame:
+    chunk = downcast_dataframe(chunk)
+    if categorize:
+        for column in chunk.columns:
+            if pd.api.types.is_object_dtype(chunk[column].dtype):
+                encoded = encode_column(chunk[column])
+                if encoded is not None:
+                    chunk[column] = encoded
+    return chunk
+
+
+def _concat_chunks(chunks: List[pd.DataFrame]) -> pd.DataFrame:
+    columns = {}
+    for column in chunks[0].columns:
+        parts = [chunk.pop(column) for chunk in chunks]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            # pd.concat would fall back to object for differing categories
+            columns[column] = pd.Series(
+                union_categoricals(parts, sort_categories=True), name=column
+            )
+        else:
+            columns[column] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def load_extract_chunked(
+    path: str,
+    columns: List[str] | None = None,
+    ddi=None,
+    chunksize: int = LOAD_CHUNK_ROWS,
+    categorize: bool = True,
+    verbose: bool = True,
+) -> pd.DataFrame:
+    """
+    Load an IPUMS extract without materializing it at full width.
+
+    Each chunk is projected to `columns` and compacted as soon as it is read:
+    numeric columns are downcast to the narrowest safe dtype and, with
+    `categorize`, low-cardinality text columns are dictionary-encoded. Peak
+    memory therefore stays close to the compact size of the result.
+
+    Parameters:
+    path (str): Path of the data file (CSV, or fixed-width with `ddi`).
+    columns (list): Columns the session needs, every column when omitted.
+    ddi (str | ipumspy Codebook): Codebook of a fixed-width extract (optional).
+    chunksize (int): Number of rows per chunk.
+    categorize (bool): Whether to dictionary-encode low-cardinality text.
+    verbose (bool): Whether to print the progress.
+
+    Returns:
+    pd.DataFrame: The compact extract, ready to be passed to run().
+    """
+    chunks = []
+    rows = 0
+    for chunk in iter_extract_chunks(path, columns, ddi=ddi, chunksize=chunksize):
+        chunks.append(_compact_chunk(chunk, categorize))
+        rows += len(chunk)
+        if verbose:
+            print(f"Loaded {rows:,} rows", end="\r")
+
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+
+    data = downcast_dataframe(_concat_chunks(chunks))
+    if verbose:
+        size = data.memory_usage(deep=True).sum() / 1024**2
+        print(f"Loaded {rows:,} rows, {len(data.columns)} columns, {size:,.1f} MB")
+    return data
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from .profiling import DataProfile, profile_dataframe
+
+METADATA_CACHE_DIR = os.path.expanduser("~/.cache/dataviz")
+
+# Bump when DataProfile changes shape so stale cache files are ignored.
+CACHE_VERSION = 1
+
+# Number of rows hashed to fingerprint an extract.
+FINGERPRINT_SAMPLE_ROWS = 4096
+
+
+def fingerprint_dataframe(
+    df: pd.DataFrame,
+    source_path: str | None = None,
+    sample_rows: int = FINGERPRINT_SAMPLE_ROWS,
+) -> str:
+    """
+    Compute a cheap fingerprint identifying an extract.
+
+    The fingerprint covers the shape, the column names and dtypes, a hash of
+    evenly spaced sample rows and, when given, the size and modification time
+    of the extract file.
+
+    Parameters:
+    df (pd.DataFrame): The extract.
+    source_path (str): Path of the file the extract was loaded from (optional).
+    sample_rows (int): Number of rows included in the content hash.
+
+    Returns:
+    str: Hex digest of the fingerprint.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr((CACHE_VERSION, df.shape)).encode())
+    digest.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode())
+
+    if len(df):
+        positions = np.unique(np.linspace(0, len(df) - 1, sample_rows).astype(int))
+        sample = df.iloc[positions]
+        digest.update(pd.util.hash_pandas_object(sample, index=True).to_numpy())
+
+    if source_path is not None:
+        stat = os.stat(source_path)
+        digest.update(
+            repr(
+                (os.path.abspath(source_path), stat.st_size, stat.st_mtime_ns)
+            ).encode()
+        )
+
+    return digest.hexdigest()
+
+
+def _cache_path(fingerprint: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, f"profile_{fingerprint}.pkl")
+
+
+def load_profile(fingerprint: str, cache_dir: str = METADATA_CACHE_DIR):
+    """
+    Load a cached profile.
+
+    Parameters:
+    fingerprint (str): Fingerprint of the extract.
+    cache_dir (str): Directory holding the cache files.
+
+    Returns:
+    DataProfile | None: The cached profile, or None when missing or unreadable.
+    """
+    try:
+        with open(_cache_path(fingerprint, cache_dir), "rb") as file:
+            profile = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+    return profile if isinstance(profile, DataProfile) else None
+
+
+def save_profile(
+    profile: DataProfile, fingerprint: str, cache_dir: str = METADATA_CACHE_DIR
+):
+    """
+    Store a profile in the cache directory.
+
+    Parameters:
+    profile (DataProfile): The profile to store.
+    fingerprint (str): Fingerprint of the extract.
+    cache_dir (str): Directory holding the cache files.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(fingerprint, cache_dir)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        pickle.dump(profile, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+
+
+def cached_profile(
+    df: pd.DataFrame,
+    source_path: str | None = None,
+    cache_dir: str | None = METADATA_CACHE_DIR,
+) -> DataProfile:
+    """
+    Return the profile of an extract, reusing the on-disk cache when the
+    fingerprint matches.
+
+    Parameters:
+    df (pd.DataFrame): The extract.
+    source_path (str): Path of the file the extract was loaded from (optional).
+    cache_dir (str): Directory holding the cache files, None disables caching.
+
+    Returns:
+    DataProfile: The column profile of the extract.
+    """
+    if cache_dir is None:
+        return profile_dataframe(df)
+
+    fingerprint = fingerprint_dataframe(df, source_path=source_path)
+    profile = load_profile(fingerprint, cache_dir)
+    if profile is None:
+        profile = profile_dataframe(df)
+        try:
+            save_profile(profile, fingerprint, cache_dir)
+        except OSError as error:
+            print(f"Could not write the metadata cache: {error}")
+    return profile
@@ -0,0 +1,238 @@
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+# Columns with at most this many distinct values are dictionary-encoded.
+MAX_CATEGORY_CARDINALITY = 1000
+
+
+def _narrowest_integer(series: pd.Series) -> pd.Series:
+    array = series.to_numpy()
+    if array.size == 0:
+        return series
+    low, high = array.min(), array.max()
+    candidates = (
+        (np.uint8, np.uint16, np.uint32) if low >= 0 else (np.int8, np.int16, np.int32)
+    )
+    for dtype in candidates:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            if np.dtype(dtype).itemsize < array.dtype.itemsize:
+                return series.astype(dtype)
+            break
+    return series
+
+
+def downcast_column(series: pd.Series) -> pd.Series:
+    """
+    Convert a numeric column to the narrowest dtype that holds every value
+    exactly.
+
+    Integers get the smallest (unsigned when possible) integer type that fits
+    their range. Floats holding only whole numbers and no missing values are
+    converted to integers; other floats become float32 when that round-trips
+    without loss.
+
+    Parameters:
+    series (pd.Series): The column to downcast.
+
+    Returns:
+    pd.Series: The downcast column, or `series` itself when nothing narrower
+    is safe.
+    """
+    if not isinstance(series.dtype, np.dtype):
+        return series
+
+    if series.dtype.kind in "iu":
+        return _narrowest_integer(series)
+
+    if series.dtype.kind == "f":
+        array = series.to_numpy()
+        nulls = np.isnan(array)
+        if (
+            array.size
+            and not nulls.any()
+            and np.array_equal(array, np.trunc(array))
+            and np.abs(array).max() < 2**53
+        ):
+            return _narrowest_integer(series.astype(np.int64))
+        if series.dtype.itemsize > 4:
+            narrow = array.astype(np.float32)
+            if np.array_equal(narrow.astype(array.dtype), array, equal_nan=True):
+                return pd.Series(narrow, index=series.index, name=series.name)
+
+    return series
+
+
+def downcast_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Downcast every numeric column of the DataFrame with downcast_column.
+
+    Returns:
+    pd.DataFrame: A new DataFrame sharing the untouched columns with `df`.
+    """
+    downcast_df = df.copy(deep=False)
+    for column in df.columns:
+        series = df[column]
+        downcast = downcast_column(series)
+        if downcast.dtype != series.dtype:
+            downcast_df[column] = downcast
+    return downcast_df
+
+
+def _encode_integers(series: pd.Series, max_cardinality: int) -> pd.Series | None:
+    array = series.to_numpy()
+    if array.size == 0:
+        return None
+    low, high = int(array.min()), int(array.max())
+    if high - low >= max_cardinality * 64:
+        # A sparse value range: fall back to hashing
+        categories = pd.unique(array)
+        if len(categories) > max_cardinality:
+            return None
+        return series.astype(pd.CategoricalDtype(np.sort(categories)))
+
+    offsets = np.subtract(array, low, dtype=np.int64)
+    present = np.bincount(offsets).astype(bool)
+    if present.sum() > max_cardinality:
+        return None
+
+    lookup = np.cumsum(present) - 1
+    categories = (np.flatnonzero(present) + low).astype(array.dtype)
+    codes = lookup[offsets]
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=categories),
+        index=series.index,
+        name=series.name,
+    )
+
+
+def encode_column(
+    series: pd.Series, max_cardinality: int = MAX_CATEGORY_CARDINALITY
+) -> pd.Series | None:
+    """
+    Dictionary-encode a single column as a pd.Categorical.
+
+    Parameters:
+    series (pd.Series): The column to encode.
+    max_cardinality (int): Largest number of distinct values to encode.
+
+    Returns:
+    pd.Series | None: The encoded column, or None if the column has too many
+    distinct values or an unsupported dtype.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return None
+
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in "iu":
+        return _encode_integers(series, max_cardinality)
+
+    if pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(
+        series.dtype
+    ):
+        encoded = series.astype("category")
+        if len(encoded.cat.categories) > max_cardinality:
+            return None
+        return encoded
+
+    return None
+
+
+def encode_categoricals(
+    df: pd.DataFrame,
+    columns: Iterable[str] | None = None,
+    max_cardinality: int = MAX_CATEGORY_CARDINALITY,
+) -> pd.DataFrame:
+    """
+    Convert low-cardinality columns to pd.Categorical so filters and groupbys
+    work on compact integer codes instead of raw values.
+
+    All object/string columns are eligible. Integer code variables (STATEFIP,
+    SEX, RACE, ...) are only encoded when listed in `columns`, so numeric
+    variables such as YEAR or AGE keep their range sliders. Encoded columns
+    are treated as categorical variables by the column profile.
+
+    Parameters:
+    df (pd.DataFrame): The extract.
+    columns (list): Additional columns to encode regardless of dtype (optional).
+    max_cardinality (int): Largest number of distinct values to encode.
+
+    Returns:
+    pd.DataFrame: A new DataFrame sharing the untouched columns with `df`.
+    """
+    columns = set(columns or [])
+    missing = columns.difference(df.columns)
+    if missing:
+        raise ValueError(f"Unknown columns to encode: {sorted(missing)}")
+
+    encoded_df = df.copy(deep=False)
+    for column in df.columns:
+        series = df[column]
+        if column not in columns and not (
+            pd.api.types.is_object_dtype(series.dtype)
+            or pd.api.types.is_string_dtype(series.dtype)
+        ):
+            continue
+        encoded = encode_column(series, max_cardinality=max_cardinality)
+        if encoded is not None:
+            encoded_df[column] = encoded
+
+    return encoded_df
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compare the per-column memory usage of a DataFrame before and after
+    optimization.
+
+    Parameters:
+    before (pd.DataFrame): The original DataFrame.
+    after (pd.DataFrame): The optimized DataFrame with the same columns.
+
+    Returns:
+    pd.DataFrame: One row per column with the dtypes, the sizes in MB and the
+    saving, plus a Total row.
+    """
+    size_before = before.memory_usage(deep=True, index=False) / 1024**2
+    size_after = after.memory_usage(deep=True, index=False) / 1024**2
+    report = pd.DataFrame(
+        {
+            "Before dtype": before.dtypes.astype(str),
+            "After dtype": after.dtypes.astype(str),
+            "Before (MB)": size_before,
+            "After (MB)": size_after.reindex(size_before.index),
+        }
+    )
+    report.loc["Total"] = ["", "", size_before.sum(), size_after.sum()]
+    saved = 1 - report["After (MB)"] / report["Before (MB)"]
+    report["Saved (%)"] = 100 * saved.where(report["Before (MB)"] > 0, 0)
+    return report.round(2)
+
+
+def optimize_dtypes(
+    df: pd.DataFrame,
+    categorize: bool = True,
+    max_cardinality: int = MAX_CATEGORY_CARDINALITY,
+    verbose: bool = True,
+) -> pd.DataFrame:
+    """
+    Downcast the numeric columns and, with `categorize`, dictionary-encode the
+    low-cardinality text columns of the DataFrame.
+
+    Parameters:
+    df (pd.DataFrame): The extract.
+    categorize (bool): Whether to convert low-cardinality object columns to
+    pd.Categorical.
+    max_cardinality (int): Largest number of distinct values to encode.
+    verbose (bool): Whether to print the per-column memory report.
+
+    Returns:
+    pd.DataFrame: A new DataFrame sharing the untouched columns with `df`.
+    """
+    optimized = downcast_dataframe(df)
+    if categorize:
+        optimized = encode_categoricals(optimized, max_cardinality=max_cardinality)
+    if verbose:
+        print(memory_report(df, optimized).to_string())
+    return optimized
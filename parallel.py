@@ -0,0 +1,145 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, Dict, List
+
+import numpy as np
+
+# Worker processes used once parallel execution is enabled.
+PARALLEL_WORKERS = min(8, os.cpu_count() or 1)
+
+# Below this many rows the work is done in-process: starting the tasks and
+# copying the arrays to shared memory costs more than it saves.
+PARALLEL_MIN_ROWS = 1_000_000
+
+_pool = None
+
+
+def enable_parallel(workers: int = PARALLEL_WORKERS):
+    """
+    Fan the pairwise frequency tables and the per-column group aggregations
+    out to a pool of worker processes. Parallel execution is off by default.
+
+    The workers are started here, so call this from the main thread (run()
+    does): forking later from a background thread could copy locks held by
+    other threads into the workers.
+
+    Parameters:
+    workers (int): Number of worker processes.
+    """
+    global _pool
+    disable_parallel()
+    if workers < 2:
+        return
+    # Forked workers don't re-import the package, whose import mounts the
+    # Colab drive
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    # Workers forked after the resource tracker started share the parent's,
+    # instead of each reporting the shared blocks they map as leaked
+    resource_tracker.ensure_running()
+    _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    # The first task launches every worker process now rather than on the
+    # first parallel_map, which runs on a BackgroundRunner thread
+    _pool.submit(os.getpid).result()
+
+
+def disable_parallel():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+    _pool = None
+
+
+def parallel_enabled() -> bool:
+    return _pool is not None
+
+
+class SharedArrays:
+    """
+    Copies of numpy arrays in named shared memory blocks, so worker processes
+    map them instead of receiving a pickled copy with every task.
+
+    Used as a context manager; the blocks are released on exit.
+
+    Attributes:
+    handles (dict): Name -> (block name, shape, dtype) of every array, which
+    is all a task needs to map it.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self._blocks = []
+        self.handles = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            self._blocks.append(block)
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+            self.handles[name] = (block.name, array.shape, array.dtype.str)
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+
+def _attach(block_name: str) -> shared_memory.SharedMemory:
+    try:
+        # The parent owns the block; don't let the worker's tracker unlink it
+        return shared_memory.SharedMemory(name=block_name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=block_name)
+
+
+def _run_task(function: Callable, handles: dict, task: tuple):
+    blocks = {name: _attach(handle[0]) for name, handle in handles.items()}
+    arrays = {
+        name: np.ndarray(shape, np.dtype(dtype), buffer=blocks[name].buf)
+        for name, (_, shape, dtype) in handles.items()
+    }
+    try:
+        return function(arrays, *task)
+    finally:
+        # The views must go before the blocks can be closed
+        arrays.clear()
+        for block in blocks.values():
+            block.close()
+
+
+def parallel_map(
+    function: Callable, arrays: Dict[str, np.ndarray], tasks: List[tuple]
+) -> list:
+    """
+    Call `function(arrays, *task)` for every task and return the results in
+    the order of `tasks`.
+
+    With parallel execution enabled and large enough arrays, the arrays are
+    placed in shared memory and the tasks run in the worker processes;
+    otherwise they run here one after the other. `function` must be a
+    module-level function and must not return views of the arrays.
+
+    Parameters:
+    function (Callable): The unit of work.
+    arrays (dict): The named column arrays the tasks read.
+    tasks (list): The extra arguments of every call.
+
+    Returns:
+    list: The results, in the order of `tasks`.
+    """
+    rows = max((len(array) for array in arrays.values()), default=0)
+    if not parallel_enabled() or len(tasks) < 2 or rows < PARALLEL_MIN_ROWS:
+        return [function(arrays, *task) for task in tasks]
+
+    with SharedArrays(arrays) as shared:
+        futures = [
+            _pool.submit(_run_task, function, shared.handles, task) for task in tasks
+        ]
+        return [future.result() for future in futures]
@@ -1,25 +1,177 @@
+from functools import partial
 from typing import *
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from .filter_data import and_filter_subset, filter_subset
+from .aggregation_cache import aggregation_cache, aggregation_key
+from .crosstab import factorize_column
+from .filter_data import (
+    and_filter_subset,
+    filter_subset,
+    get_filter_engine,
+    materialize,
+)
+from .parallel import parallel_map
+from .variance import (
+    mean_standard_errors,
+    replicate_columns,
+    total_standard_errors,
+)
+from .weights import (
+    weight_array,
+    weighted_counts,
+    weighted_means,
+    weighted_proportions,
+    weighted_quantiles,
+    weighted_sums,
+)
 
 from .settings import *
 
+# Above this many rows scatter plots are downsampled and drawn with WebGL.
+SCATTER_MAX_POINTS = 50_000
+# Above this many rows "auto" mode draws a 2D density heatmap instead.
+SCATTER_DENSITY_MIN_ROWS = 2_000_000
+DENSITY_BINS = 200
+
+
+def _sample_positions(n_rows: int, size: int, rng: np.random.Generator) -> np.ndarray:
+    if n_rows <= size:
+        return np.arange(n_rows)
+    return np.sort(rng.choice(n_rows, size=size, replace=False))
+
+
+def _group_rows(df: pd.DataFrame, groups: list) -> List[Tuple[str, np.ndarray]]:
+    # The trace name and row positions of every group, the same in every
+    # scatter mode
+    group_rows = []
+    for column, values in groups:
+        values = list(values) if isinstance(values, (list, tuple)) else [values]
+        rows = np.flatnonzero(df[column].isin(values).to_numpy())
+        group_rows.append((f"{column}={values}", rows))
+    return group_rows
+
+
+def _sampled_scatter(
+    x: str, y: str, df: pd.DataFrame, groups: list, max_points: int
+) -> go.Figure:
+    rng = np.random.default_rng(0)
+    fig = go.Figure()
+
+    if groups:
+        # Stratified: every group gets the same share of the point budget
+        quota = max(1, max_points // len(groups))
+        for name, rows in _group_rows(df, groups):
+            rows = rows[_sample_positions(len(rows), quota, rng)]
+            fig.add_trace(
+                go.Scattergl(
+                    x=df[x].to_numpy()[rows],
+                    y=df[y].to_numpy()[rows],
+                    mode="markers",
+                    name=name,
+                )
+            )
+        shown = "stratified sample"
+    else:
+        rows = _sample_positions(len(df), max_points, rng)
+        fig.add_trace(
+            go.Scattergl(
+                x=df[x].to_numpy()[rows], y=df[y].to_numpy()[rows], mode="markers"
+            )
+        )
+        shown = f"random sample of {len(rows):,} rows"
+
+    fig.update_traces(hoverinfo="skip", hovertemplate=None, marker=dict(size=3))
+    fig.update_layout(
+        title=f"Scatter plot of ({y}) by ({x}), {shown} out of {len(df):,}",
+        xaxis_title=x,
+        yaxis_title=y,
+    )
+    return fig
+
+
+def _density_heatmap(
+    x: str, y: str, df: pd.DataFrame, bins: int, groups: list | None = None
+) -> go.Figure:
+    x_values = df[x].to_numpy(dtype=float)
+    y_values = df[y].to_numpy(dtype=float)
+    valid = ~(np.isnan(x_values) | np.isnan(y_values))
+    counts, x_edges, y_edges = np.histogram2d(
+        x_values[valid], y_values[valid], bins=bins
+    )
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+
+    if not groups:
+        fig = go.Figure(
+            go.Heatmap(
+                x=x_centers,
+                y=y_centers,
+                z=np.where(counts > 0, counts, np.nan).T,
+                colorscale="Viridis",
+                colorbar=dict(title="Count"),
+            )
+        )
+    else:
+        # Overlapping heatmaps would hide each other, so every group is drawn
+        # as density contour lines of its own colour over the same bins
+        fig = go.Figure()
+        colors = px.colors.qualitative.Plotly
+        for position, (name, rows) in enumerate(_group_rows(df, groups)):
+            rows = rows[valid[rows]]
+            group_counts, _, _ = np.histogram2d(
+                x_values[rows], y_values[rows], bins=[x_edges, y_edges]
+            )
+            color = colors[position % len(colors)]
+            fig.add_trace(
+                go.Contour(
+                    x=x_centers,
+                    y=y_centers,
+                    z=group_counts.T,
+                    name=name,
+                    showlegend=True,
+                    showscale=False,
+                    contours_coloring="lines",
+                    colorscale=[[0, color], [1, color]],
+                    line_width=1.5,
+                )
+            )
+    fig.update_layout(
+        title=f"Density of ({y}) by ({x}) over {int(valid.sum()):,} rows",
+        xaxis_title=x,
+        yaxis_title=y,
+    )
+    return fig
+
 
 def x_y_scatter(
-    x: str, y: str, df: pd.DataFrame | None = None, groups: list | None = None
+    x: str,
+    y: str,
+    df: pd.DataFrame | None = None,
+    groups: list | None = None,
+    large_data_mode: str = "auto",
+    max_points: int = SCATTER_MAX_POINTS,
 ) -> go.Figure:
     """
     Generate a scatter plot with the x-axis and y-axis as numeric variables.
 
+    Extracts with more than `max_points` rows are not sent to the browser in
+    full: they are either downsampled and drawn with WebGL, or binned into a
+    2D density heatmap, so the figure size stays bounded.
+
     Parameters:
     x (str): Column name for the x-axis (numeric variable).
     y (str): Column name for the y-axis (numeric variable).
     df (pd.DataFrame): DataFrame containing the data.
+    groups (list): List of (column, values) groups, drawn as one trace (or
+    density layer) each in every mode (optional).
+    large_data_mode (str): "auto", "sample", "density" or "raw" (always plot
+    every row).
+    max_points (int): Row threshold and point budget of the sampled plot.
 
     Returns:
-    px.scatter: Plotly scatter plot figure.
+    go.Figure: Plotly scatter plot figure.
     """
     if df is None:
         raise ValueError("The input DataFrame is empty.")
@@ -32,9 +184,33 @@ def x_y_scatter(
     if not pd.api.types.is_numeric_dtype(df[y]):
         raise ValueError(f"The y-axis column '{y}' must be numeric.")
 
-    # TODO: add grouping
+    if large_data_mode not in ("auto", "sample", "density", "raw"):
+        raise ValueError(f"Invalid large data mode: {large_data_mode}")
 
-    fig = px.scatter(df, x=x, y=y, title=f"Scatter plot of ({y}) by ({x})")
+    if large_data_mode != "raw" and len(df) > max_points:
+        if large_data_mode == "density" or (
+            large_data_mode == "auto" and len(df) > SCATTER_DENSITY_MIN_ROWS
+        ):
+            return _density_heatmap(x, y, df, DENSITY_BINS, groups)
+        return _sampled_scatter(x, y, df, groups, max_points)
+
+    if groups:
+        # Every row of every group, one trace per group as in the sampled plot
+        fig = go.Figure()
+        for name, rows in _group_rows(df, groups):
+            fig.add_trace(
+                go.Scattergl(
+                    x=df[x].to_numpy()[rows],
+                    y=df[y].to_numpy()[rows],
+                    mode="markers",
+                    name=name,
+                )
+            )
+        fig.update_layout(
+            title=f"Scatter plot of ({y}) by ({x})", xaxis_title=x, yaxis_title=y
+        )
+    else:
+        fig = px.scatter(df, x=x, y=y, title=f"Scatter plot of ({y}) by ({x})")
     fig.update_traces(hoverinfo="skip", hovertemplate=None)
 
     return fig
@@ -44,12 +220,22 @@ def x_y_scatter(
 # fig3.show()
 
 
-def x_stacked(x: str, df: pd.DataFrame | None = None) -> go.Figure:
+def x_stacked(
+    x: str, df: pd.DataFrame | None = None, weight: str | None = None
+) -> go.Figure:
     if df is None:
         raise ValueError("The input DataFrame is None.")
-    proportions = df[x].value_counts(normalize=True).reset_index()
-    proportions.columns = [x, "Proportion"]
-    proportions["Proportion"] *= 100
+    if weight is None:
+        proportions = df[x].value_counts(normalize=True).reset_index()
+        proportions.columns = [x, "Proportion"]
+        proportions["Proportion"] *= 100
+    else:
+        codes, values = factorize_column(df[x])
+        totals = weighted_counts(codes, len(values), weight_array(df, weight))
+        proportions = pd.DataFrame(
+            {x: values, "Proportion": 100 * totals / totals.sum()}
+        )
+        proportions = proportions.sort_values("Proportion", ascending=False)
 
     fig = go.Figure(
         data=[
@@ -72,51 +258,386 @@ def x_stacked(x: str, df: pd.DataFrame | None = None) -> go.Figure:
     return fig
 
 
-def plot_generic_data(
-    plot_func,
+def _weighted_aggregate(
+    frame: pd.DataFrame,
+    x: str,
+    y: str,
+    grouping_type: str,
+    weights: np.ndarray,
+    numeric_y: bool,
+) -> pd.Series:
+    # Same results as _aggregate, with every row counted `weight` times
+    x_codes, x_values = factorize_column(frame[x])
+    n_x = len(x_values)
+    if grouping_type == "count" or not numeric_y:
+        results = weighted_counts(x_codes, n_x, weights)
+        if grouping_type in ("avg", "cluster avg") and not numeric_y:
+            # Like count() / nunique(), rows with a missing y are left out
+            y_codes, y_values = factorize_column(frame[y])
+            present = np.where(y_codes >= 0, x_codes, -1)
+            valid = present >= 0
+            pairs = np.unique(x_codes[valid] * len(y_values) + y_codes[valid])
+            nunique = np.bincount(pairs // len(y_values), minlength=n_x)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                results = weighted_counts(present, n_x, weights) / nunique
+    elif grouping_type in ("sum", "cluster sum"):
+        results = weighted_sums(x_codes, n_x, frame[y].to_numpy(dtype=float), weights)
+    elif grouping_type in ("avg", "cluster avg"):
+        results = weighted_means(x_codes, n_x, frame[y].to_numpy(dtype=float), weights)
+    else:
+        return pd.Series(dtype=float)
+
+    observed = np.bincount(x_codes[x_codes >= 0], minlength=n_x) > 0
+    aggregated = pd.Series(results[observed], index=x_values[observed])
+    aggregated.index.name = x
+    return aggregated
+
+
+def _aggregate(
+    frame: pd.DataFrame,
+    keys: list,
+    x: str,
+    y: str,
+    grouping_type: str,
+    numeric_y: bool,
+    weights: np.ndarray | None = None,
+) -> pd.Series:
+    if weights is not None:
+        return _weighted_aggregate(frame, x, y, grouping_type, weights, numeric_y)
+    grouped = frame.groupby(keys, observed=True)
+    if grouping_type == "count":
+        return grouped[x].count()
+    elif not numeric_y:
+        if grouping_type in ("sum", "cluster sum"):
+            return grouped[y].size()
+        elif grouping_type in ("avg", "cluster avg"):
+            grouped_data = grouped[y].agg(["count", "nunique"])
+            return grouped_data["count"] / grouped_data["nunique"]
+    elif grouping_type in ("sum", "cluster sum"):
+        return grouped[y].sum()
+    elif grouping_type in ("avg", "cluster avg"):
+        return grouped[y].mean()
+
+    return pd.Series(dtype=float)
+
+
+def _group_values(values) -> list:
+    return list(values) if isinstance(values, (list, tuple)) else [values]
+
+
+def _stacked_count_nunique(
+    x_codes: np.ndarray,
+    n_x: int,
+    y: pd.Series,
+    df: pd.DataFrame,
+    groups: list,
+    weights: np.ndarray | None = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # count / nunique is not additive over group values, so the rows of every
+    # group are stacked (once per group they belong to) as one integer key
+    # per (group, x, y) and the distinct keys are counted in one pass
+    y_codes, y_values = factorize_column(y)
+    n_y = len(y_values)
+    factorized = {column: factorize_column(df[column]) for column, _ in groups}
+    keys = []
+    key_weights = []
+    for group_id, (column, values) in enumerate(groups):
+        codes, column_values = factorized[column]
+        lookup = np.append(column_values.isin(_group_values(values)), False)
+        rows = np.flatnonzero(lookup[codes] & (x_codes >= 0) & (y_codes >= 0))
+        keys.append((group_id * n_x + x_codes[rows]) * n_y + y_codes[rows])
+        if weights is not None:
+            key_weights.append(weights[rows])
+    keys = np.concatenate(keys)
+
+    n_cells = len(groups) * n_x
+    counts = np.bincount(
+        keys // n_y,
+        weights=np.concatenate(key_weights) if weights is not None else None,
+        minlength=n_cells,
+    )
+    nunique = np.bincount(np.unique(keys) // n_y, minlength=n_cells)
+    return counts.reshape(len(groups), n_x), nunique.reshape(len(groups), n_x)
+
+
+_X_CODES, _Y_VALUES, _WEIGHTS = "__x__", "__y__", "__weights__"
+
+
+def _cell_partials(
+    arrays: dict, column: str, n_codes: int, n_x: int, numeric_y: bool
+) -> Tuple[np.ndarray, ...]:
+    # Row counts, total weights, y sums and y counts (weighted when weights
+    # are given) of every (group column value, x) cell
+    codes, x_codes = arrays[column], arrays[_X_CODES]
+    weights = arrays.get(_WEIGHTS)
+    valid = (codes >= 0) & (x_codes >= 0)
+    cells = codes[valid] * n_x + x_codes[valid]
+    n_cells = n_codes * n_x
+    shape = (n_codes, n_x)
+    sizes = np.bincount(cells, minlength=n_cells).reshape(shape)
+    if weights is not None:
+        weights = weights[valid]
+        totals = np.bincount(cells, weights, minlength=n_cells).reshape(shape)
+    else:
+        totals = sizes
+    if not numeric_y:
+        return sizes, totals, None, None
+
+    y_values = arrays[_Y_VALUES][valid]
+    present = ~np.isnan(y_values)
+    if weights is not None:
+        y_values = y_values * weights
+    present_weights = None if weights is None else weights[present]
+    sums = np.bincount(cells[present], y_values[present], minlength=n_cells)
+    counts = np.bincount(cells[present], present_weights, minlength=n_cells)
+    return sizes, totals, sums.reshape(shape), counts.reshape(shape)
+
+
+def cluster_aggregate(
+    x: str,
+    y: str,
+    df: pd.DataFrame,
+    groups: List[Tuple[str, list]],
+    grouping_type: str,
+    weight: str | None = None,
+    numeric_y: bool | None = None,
+) -> List[Tuple[str, pd.Series]]:
+    """
+    Aggregate y by x separately for every group without materializing a
+    subset per group.
+
+    x and every grouping column are factorized once, and the partial counts
+    and sums of every (group value, x) cell are computed with one bincount
+    per grouping column. A (groups x group values) membership matrix then
+    combines the cells into one series per group, which also handles
+    overlapping group definitions. The "avg" of a categorical y is not
+    additive; it is computed from the rows stacked once per group instead.
+
+    Parameters:
+    x (str): Column name for the x-axis.
+    y (str): Column name for the y-axis.
+    df (pd.DataFrame): DataFrame containing the data.
+    groups (list): List of (column, values) groups.
+    grouping_type (str): One of "cluster sum", "cluster avg" or "count".
+    weight (str): Weight column; counts, sums and means are weighted by it.
+    numeric_y (bool): Whether y is numeric, looked up in the session profile
+    when omitted.
+
+    Returns:
+    List[Tuple[str, pd.Series]]: The trace name and aggregated series of every
+    group, in the order of `groups`.
+    """
+    names = [f"{column}={values}" for column, values in groups]
+    if numeric_y is None:
+        numeric_y = is_numerical(y)
+
+    x_codes, x_values = factorize_column(df[x])
+    n_x = len(x_values)
+    if numeric_y:
+        y_values = df[y].to_numpy(dtype=float)
+
+    factorized = {
+        column: factorize_column(df[column])
+        for column in dict.fromkeys(column for column, _ in groups)
+    }
+    arrays = {column: codes for column, (codes, _) in factorized.items()}
+    arrays[_X_CODES] = x_codes
+    if numeric_y:
+        arrays[_Y_VALUES] = y_values
+    weights = weight_array(df, weight)
+    if weights is not None:
+        arrays[_WEIGHTS] = weights
+    tasks = [
+        (column, len(values), n_x, numeric_y)
+        for column, (_, values) in factorized.items()
+    ]
+    # One independent unit of work per grouping column, which parallel_map
+    # may run in worker processes
+    partials = parallel_map(_cell_partials, arrays, tasks)
+
+    sizes = np.zeros((len(groups), n_x))
+    totals = np.zeros((len(groups), n_x))
+    sums = np.zeros((len(groups), n_x))
+    counts = np.zeros((len(groups), n_x))
+    for (column, (_, values)), (cell_sizes, cell_totals, cell_sums, cell_counts) in zip(
+        factorized.items(), partials
+    ):
+        group_ids = [i for i, (c, _) in enumerate(groups) if c == column]
+        membership = np.array(
+            [values.isin(_group_values(groups[i][1])) for i in group_ids], dtype=float
+        )
+        sizes[group_ids] = membership @ cell_sizes
+        totals[group_ids] = membership @ cell_totals
+        if numeric_y:
+            sums[group_ids] = membership @ cell_sums
+            counts[group_ids] = membership @ cell_counts
+
+    # Row counts stay integers, weighted totals are estimates
+    totals = totals.astype(np.int64) if weights is None else totals
+    if grouping_type == "count":
+        results = totals
+    elif not numeric_y:
+        if grouping_type in ("avg", "cluster avg"):
+            counts, nunique = _stacked_count_nunique(
+                x_codes, n_x, df[y], df, groups, weights
+            )
+            with np.errstate(invalid="ignore", divide="ignore"):
+                results = counts / nunique
+        else:
+            results = totals
+    elif grouping_type in ("sum", "cluster sum"):
+        results = sums
+    else:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            results = sums / counts
+
+    series = []
+    for name, group_sizes, group_results in zip(names, sizes, results):
+        observed = group_sizes > 0
+        grouped_data = pd.Series(group_results[observed], index=x_values[observed])
+        grouped_data.index.name = x
+        series.append((name, grouped_data))
+    return series
+
+
+def aggregate_series(
     x: str,
     y: str,
     df: pd.DataFrame,
     groups: List[Tuple[str, list]] | None = None,
     grouping_type: str = "sum",
-) -> go.Figure:
-    if groups is None:
+    weight: str | None = None,
+) -> List[Tuple[str | None, pd.Series]]:
+    """
+    Compute the aggregated series behind the line, area and grouped bar plots.
+    With a weight column, counts are sums of weights and sums/means are
+    weighted.
+
+    Returns:
+    List[Tuple[str | None, pd.Series]]: The trace name (None for an ungrouped
+    plot) and the series indexed by x of every trace.
+    """
+    numeric_y = is_numerical(y)
+    if not groups:
+        weights = weight_array(df, weight)
+        return [(None, _aggregate(df, [x], x, y, grouping_type, numeric_y, weights))]
+    if grouping_type in ["sum", "avg"]:
+        subset = and_filter_subset(df, groups)
+        weights = weight_array(subset, weight)
+        return [
+            (
+                f"{grouping_type} of {y} by {x}",
+                _aggregate(subset, [x], x, y, grouping_type, numeric_y, weights),
+            )
+        ]
+    return cluster_aggregate(x, y, df, groups, grouping_type, weight, numeric_y)
+
+
+def standard_error_series(
+    x: str,
+    y: str,
+    df: pd.DataFrame,
+    groups: List[Tuple[str, list]] | None = None,
+    grouping_type: str = "sum",
+    weight: str = "PERWT",
+) -> List[Tuple[str | None, pd.Series]] | None:
+    """
+    Compute the replicate-weight standard errors of the aggregate_series
+    traces, for the error bars of the line and grouped bar plots.
+
+    Every (trace, x) cell is one group of a single pass over the replicate
+    weights, rows of overlapping groups being counted in each of them.
+
+    Returns:
+    List[Tuple[str | None, pd.Series]] | None: The trace name and standard
+    errors indexed by x of every trace, None for the average of a
+    categorical y (a count per distinct value, which has no survey
+    estimate).
+    """
+    numeric_y = is_numerical(y)
+    if not numeric_y and grouping_type in ("avg", "cluster avg"):
+        return None
+    groups = groups or []
+    if groups and grouping_type in ["sum", "avg"]:
+        df = and_filter_subset(df, groups)
+        names = [f"{grouping_type} of {y} by {x}"]
         groups = []
+    elif groups:
+        names = [f"{column}={values}" for column, values in groups]
+    else:
+        names = [None]
+
+    x_codes, x_values = factorize_column(df[x])
+    n_x = len(x_values)
+    membership = [x_codes]
+    for group_id, (column, values) in enumerate(groups):
+        codes, column_values = factorize_column(df[column])
+        lookup = np.append(column_values.isin(_group_values(values)), False)
+        member = lookup[codes] & (x_codes >= 0)
+        membership.append(np.where(member, group_id * n_x + x_codes, -1))
+    if groups:
+        membership = membership[1:]
+    size = len(names) * n_x
+
+    if grouping_type == "count" or not numeric_y:
+        estimates, errors = total_standard_errors(df, membership, size, weight)
+    else:
+        values = df[y].to_numpy(dtype=float)
+        if grouping_type in ("sum", "cluster sum"):
+            estimates, errors = total_standard_errors(
+                df, membership, size, weight, values
+            )
+        else:
+            estimates, errors = mean_standard_errors(
+                df, membership, size, weight, values
+            )
+
+    series = []
+    for name, trace_errors in zip(names, errors.reshape(len(names), n_x)):
+        trace_errors = pd.Series(trace_errors, index=x_values)
+        trace_errors.index.name = x
+        series.append((name, trace_errors))
+    return series
+
+
+def _error_bars(errors: pd.Series | None, data: pd.Series) -> dict | None:
+    if errors is None:
+        return None
+    return dict(type="data", array=errors.reindex(data.index).to_numpy())
 
-    def get_grouped_data(subset: pd.DataFrame) -> pd.Series:
-        if grouping_type == "count":
-            return subset.groupby(x)[x].count()
-        elif y not in numerical_attributes:
-            if grouping_type in ("sum", "cluster sum"):
-                return subset.groupby(x)[y].size()
-            elif grouping_type in ("avg", "cluster avg"):
-                grouped_data = subset.groupby(x)[y].agg(["count", "nunique"])
-                return grouped_data["count"] / grouped_data["nunique"]
-        elif grouping_type in ("sum", "cluster sum"):
-            return subset.groupby(x)[y].sum()
-        elif grouping_type in ("avg", "cluster avg"):
-            return subset.groupby(x)[y].mean()
 
-        return pd.Series()
+def _title(title: str, weight: str | None) -> str:
+    return title if weight is None else f"{title} (weighted by {weight})"
 
+
+def plot_generic_data(
+    plot_func,
+    x: str,
+    y: str,
+    df: pd.DataFrame,
+    groups: List[Tuple[str, list]] | None = None,
+    grouping_type: str = "sum",
+    series: List[Tuple[str | None, pd.Series]] | None = None,
+    weight: str | None = None,
+    errors: List[Tuple[str | None, pd.Series]] | None = None,
+) -> go.Figure:
     fig = go.Figure()
     fig.update_layout(
-        xaxis_title=x, yaxis_title=y, title=f"{grouping_type} of {y} by {x}"
+        xaxis_title=x,
+        yaxis_title=y,
+        title=_title(f"{grouping_type} of {y} by {x}", weight),
     )
 
-    if not groups:
-        grouped_data = get_grouped_data(df)
-        plot_func(grouped_data, fig)
-    else:
-        if grouping_type in ["sum", "avg"]:
-            subset = and_filter_subset(df, groups)
-            grouped_data = get_grouped_data(subset)
-            plot_func(grouped_data, fig, group_name=f"{grouping_type} of {y} by {x}")
+    if series is None:
+        series = aggregate_series(x, y, df, groups, grouping_type, weight)
+
+    for (group_name, grouped_data), (_, error) in zip(
+        series, errors or [(None, None)] * len(series)
+    ):
+        if group_name is None:
+            plot_func(grouped_data, fig, error=error)
         else:
-            for column, values in groups:
-                subset = filter_subset(df, {column: values})
-                grouped_data = get_grouped_data(subset)
-                plot_func(grouped_data, fig, group_name=f"{column}={values}")
+            plot_func(grouped_data, fig, group_name=group_name, error=error)
 
     return fig
 
@@ -127,13 +648,24 @@ def plot_line_data(
     df: pd.DataFrame,
     groups: List[Tuple[str, list]] | None = None,
     grouping_type: str = "sum",
+    series: List[Tuple[str | None, pd.Series]] | None = None,
+    weight: str | None = None,
+    errors: List[Tuple[str | None, pd.Series]] | None = None,
 ) -> go.Figure:
-    def line_plot(data, fig, group_name=None):
+    def line_plot(data, fig, group_name=None, error=None):
         fig.add_trace(
-            go.Scatter(x=data.index, y=data.values, mode="lines", name=group_name)
+            go.Scatter(
+                x=data.index,
+                y=data.values,
+                mode="lines",
+                name=group_name,
+                error_y=_error_bars(error, data),
+            )
         )
 
-    return plot_generic_data(line_plot, x, y, df, groups, grouping_type)
+    return plot_generic_data(
+        line_plot, x, y, df, groups, grouping_type, series, weight, errors
+    )
 
 
 def plot_area_data(
@@ -142,13 +674,15 @@ def plot_area_data(
     df: pd.DataFrame,
     groups: List[Tuple[str, list]] | None = None,
     grouping_type: str = "sum",
+    series: List[Tuple[str | None, pd.Series]] | None = None,
+    weight: str | None = None,
 ) -> go.Figure:
-    def area_plot(data, fig, group_name=None):
+    def area_plot(data, fig, group_name=None, error=None):
         fig.add_trace(
             go.Scatter(x=data.index, y=data.values, fill="tozeroy", name=group_name)
         )
 
-    return plot_generic_data(area_plot, x, y, df, groups, grouping_type)
+    return plot_generic_data(area_plot, x, y, df, groups, grouping_type, series, weight)
 
 
 def plot_clustered_bar_data(
@@ -157,74 +691,93 @@ def plot_clustered_bar_data(
     df: pd.DataFrame,
     groups: List[Tuple[str, list]] | None = None,
     grouping_type: str = "sum",
+    series: List[Tuple[str | None, pd.Series]] | None = None,
+    weight: str | None = None,
+    errors: List[Tuple[str | None, pd.Series]] | None = None,
 ) -> go.Figure:
-    labels = dict(index=x, value=f"{grouping_type} of {y} by {x}", barmode="group")
+    labels = dict(
+        index=x,
+        value=_title(f"{grouping_type} of {y} by {x}", weight),
+        barmode="group",
+    )
 
-    def get_grouped_data(subset):
-        if grouping_type == "count":
-            return subset.groupby(x)[x].count()
-        else:
-            if y not in numerical_attributes:
-                if grouping_type in ("sum", "cluster sum"):
-                    return subset.groupby(x)[y].size()
-                elif grouping_type in ("avg", "cluster avg"):
-                    grouped_data = subset.groupby(x)[y].agg(["count", "nunique"])
-                    return grouped_data["count"] / grouped_data["nunique"]
-            if grouping_type in ("sum", "cluster sum"):
-                return subset.groupby(x)[y].sum()
-            elif grouping_type in ("avg", "cluster avg"):
-                return subset.groupby(x)[y].mean()
+    if groups is None:
+        groups = []
 
     fig = px.bar()
     fig.update_layout(
         xaxis_title=x, yaxis_title=y, title=labels["value"], barmode="group"
     )
 
-    if len(groups) == 0:
-        grouped_data = get_grouped_data(df)
+    if series is None:
+        series = aggregate_series(x, y, df, groups, grouping_type, weight)
+    if len(groups) == 0 or grouping_type in ["sum", "avg"]:
+        grouped_data = series[0][1]
         print(grouped_data)
         fig = px.bar(grouped_data, title=labels["value"], labels=labels)
+        if errors is not None:
+            fig.update_traces(error_y=_error_bars(errors[0][1], grouped_data))
     else:
-        if grouping_type in ["sum", "avg"]:
-            subset = and_filter_subset(df, groups)
-            grouped_data = get_grouped_data(subset)
-            print(grouped_data)
-            fig = px.bar(grouped_data, title=labels["value"], labels=labels)
-        else:
-            for column, values in groups:
-                subset = filter_subset(df, [(column, values)])
-                grouped_data = get_grouped_data(subset)
-
-                fig.add_bar(
-                    x=grouped_data.index,
-                    y=grouped_data.values,
-                    name=f"{column}={values}",
-                )
+        for (group_name, grouped_data), (_, error) in zip(
+            series, errors or [(None, None)] * len(series)
+        ):
+            fig.add_bar(
+                x=grouped_data.index,
+                y=grouped_data.values,
+                name=group_name,
+                error_y=_error_bars(error, grouped_data),
+            )
 
     return fig
 
 
+def _weighted_percentages(
+    df: pd.DataFrame, x: str, y: str, weight: str
+) -> pd.DataFrame:
+    # Weighted value_counts(normalize=True) of y within every x, unstacked
+    x_codes, x_values = factorize_column(df[x])
+    y_codes, y_values = factorize_column(df[y])
+    percentages = weighted_proportions(
+        x_codes, len(x_values), y_codes, len(y_values), weight_array(df, weight)
+    )
+    table = pd.DataFrame(percentages, index=x_values, columns=y_values)
+    table = table.dropna(how="all").fillna(0)
+    table.index.name, table.columns.name = x, y
+    return table.loc[:, (table > 0).any()]
+
+
 def plot_clustered_percentage_bar_data(
     x: str,
     y: str,
     df: pd.DataFrame,
     groups: List[Tuple[str, list]] | None = None,
     grouping_type: str = "sum",
+    weight: str | None = None,
 ) -> go.Figure:
-    labels = dict(index=x, value=f"Percentage of {y} by {x}", barmode="group")
+    labels = dict(
+        index=x, value=_title(f"Percentage of {y} by {x}", weight), barmode="group"
+    )
 
     if groups is None:
         groups = []
 
     def get_grouped_data(subset):
+        if weight is not None:
+            return _weighted_percentages(
+                subset, x, x if grouping_type == "count" else y, weight
+            )
         if grouping_type == "count":
             return (
-                subset.groupby(x)[x].value_counts(normalize=True).unstack(fill_value=0)
+                subset.groupby(x, observed=True)[x]
+                .value_counts(normalize=True)
+                .unstack(fill_value=0)
                 * 100
             )
         else:
             return (
-                subset.groupby(x)[y].value_counts(normalize=True).unstack(fill_value=0)
+                subset.groupby(x, observed=True)[y]
+                .value_counts(normalize=True)
+                .unstack(fill_value=0)
                 * 100
             )
 
@@ -259,8 +812,114 @@ def plot_clustered_percentage_bar_data(
     return fig
 
 
+# Largest number of outlier points drawn per box.
+BOX_MAX_OUTLIERS = 500
+
+
+def box_statistics(
+    values: pd.Series,
+    keys: pd.Series | None = None,
+    max_outliers: int = BOX_MAX_OUTLIERS,
+    weights: pd.Series | None = None,
+) -> pd.DataFrame:
+    """
+    Compute box-plot statistics per group with vectorized groupbys.
+
+    Whiskers follow Tukey's rule (the most extreme values within 1.5 IQR of
+    the quartiles); points beyond them are outliers, of which a random sample
+    of at most `max_outliers` per group is kept.
+
+    Parameters:
+    values (pd.Series): The numeric values.
+    keys (pd.Series): Group label of every value, one box when omitted.
+    max_outliers (int): Cap on the outliers kept per group.
+    weights (pd.Series): Row weights; the quartiles are then weighted
+    quantiles, the fences and outliers stay based on the observed values.
+
+    Returns:
+    pd.DataFrame: One row per group with the q1, median, q3, lowerfence,
+    upperfence and outliers (array) columns.
+    """
+    if keys is None:
+        keys = pd.Series(0, index=values.index)
+    valid = values.notna() & keys.notna()
+    # Positional labels keep the lookups below valid for duplicated indexes
+    values = values[valid].reset_index(drop=True)
+    keys = keys[valid].reset_index(drop=True)
+    if weights is not None:
+        weights = weights[valid].fillna(0).to_numpy(dtype=float)
+    if values.empty:
+        return pd.DataFrame(
+            columns=["q1", "median", "q3", "lowerfence", "upperfence", "outliers"]
+        )
+
+    if weights is None:
+        grouped = values.groupby(keys, observed=True, sort=True)
+        stats = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    else:
+        codes, labels = factorize_column(keys)
+        quartiles = weighted_quantiles(
+            codes, len(labels), values.to_numpy(dtype=float), [0.25, 0.5, 0.75], weights
+        )
+        stats = pd.DataFrame(quartiles, index=labels).dropna(how="all")
+    stats.columns = ["q1", "median", "q3"]
+    iqr = stats["q3"] - stats["q1"]
+
+    low_limit = (stats["q1"] - 1.5 * iqr).reindex(keys).to_numpy()
+    high_limit = (stats["q3"] + 1.5 * iqr).reindex(keys).to_numpy()
+    inside = ((values >= low_limit) & (values <= high_limit)).to_numpy()
+
+    inner = values[inside].groupby(keys[inside], observed=True)
+    stats["lowerfence"] = inner.min()
+    stats["upperfence"] = inner.max()
+
+    outliers = values[~inside].sample(frac=1, random_state=0)
+    outliers = outliers.groupby(keys[outliers.index], observed=True).head(max_outliers)
+    samples = {
+        key: group.to_numpy()
+        for key, group in outliers.groupby(keys[outliers.index], observed=True)
+    }
+    stats["outliers"] = [samples.get(key, np.array([])) for key in stats.index]
+    return stats
+
+
+def _add_box_traces(fig: go.Figure, stats: pd.DataFrame, names):
+    # One precomputed box and one outlier scatter per group, so the figure
+    # size depends on the number of groups rather than the number of rows
+    for name, (_, row) in zip(names, stats.iterrows()):
+        position = [name]
+        fig.add_trace(
+            go.Box(
+                x=position,
+                q1=[row["q1"]],
+                median=[row["median"]],
+                q3=[row["q3"]],
+                lowerfence=[row["lowerfence"]],
+                upperfence=[row["upperfence"]],
+                name=str(name),
+                boxpoints=False,
+            )
+        )
+        if len(row["outliers"]):
+            fig.add_trace(
+                go.Scatter(
+                    x=position * len(row["outliers"]),
+                    y=row["outliers"],
+                    mode="markers",
+                    marker=dict(size=4),
+                    name=f"{name} outliers",
+                    showlegend=False,
+                )
+            )
+
+
 def x_y_boxplot(
-    x: str, y: str, df: pd.DataFrame, groups=None, grouping_type="sum"
+    x: str,
+    y: str,
+    df: pd.DataFrame,
+    groups=None,
+    grouping_type="sum",
+    weight: str | None = None,
 ) -> go.Figure:
     """
     Generate a boxplot with the x-axis as a categorical variable and y-axis as a numeric variable.
@@ -271,6 +930,7 @@ def x_y_boxplot(
     df (pd.DataFrame): DataFrame containing the data.
     groups (list): List of additional groupings (optional).
     grouping_type (str): Type of grouping to apply (default is "sum").
+    weight (str): Weight column for weighted quartiles (optional).
 
     Returns:
     fig: Plotly Figure object.
@@ -281,12 +941,19 @@ def x_y_boxplot(
     if not pd.api.types.is_numeric_dtype(df[y]):
         raise ValueError(f"The y-axis column '{y}' must be numeric.")
 
-    fig = px.box(df, x=x, y=y, title=f"Boxplot of ({y}) by ({x})")
+    stats = box_statistics(df[y], df[x], weights=None if weight is None else df[weight])
+    fig = go.Figure()
+    _add_box_traces(fig, stats, stats.index)
+    fig.update_layout(xaxis_title=x, yaxis_title=y, title=f"Boxplot of ({y}) by ({x})")
     return fig
 
 
 def x_boxplot(
-    x: str, df: pd.DataFrame, groups: list | None = None, grouping_type="sum"
+    x: str,
+    df: pd.DataFrame,
+    groups: list | None = None,
+    grouping_type="sum",
+    weight: str | None = None,
 ) -> go.Figure:
     """
     Generate a boxplot with the x-axis as a categorical variable.
@@ -296,6 +963,7 @@ def x_boxplot(
     df (pd.DataFrame): DataFrame containing the data.
     groups (list): List of tuples for additional groupings (optional).
     grouping_type (str): Type of grouping to apply (default is "sum").
+    weight (str): Weight column for weighted quartiles (optional).
 
     Returns:
     go.Figure: Plotly Figure object.
@@ -304,23 +972,33 @@ def x_boxplot(
         groups = []
 
     print(f"grouping type: {grouping_type}")
+    fig = go.Figure()
     if len(groups) > 0:
-        fig = go.Figure()
-
         for column, values in groups:
             subset = filter_subset(df, [(column, values)])
-            fig.add_trace(
-                go.Box(y=subset[x], name=f"Boxplot of ({x}) for {column}={values}")
+            _add_box_traces(
+                fig,
+                box_statistics(
+                    subset[x], weights=None if weight is None else subset[weight]
+                ),
+                [f"Boxplot of ({x}) for {column}={values}"],
             )
-            fig.update_xaxes(showticklabels=False)
-            fig.update_layout(yaxis_title=x, title=f"Boxplot of {x} by groups")
+        fig.update_xaxes(showticklabels=False)
+        fig.update_layout(yaxis_title=x, title=f"Boxplot of {x} by groups")
     else:
-        fig = px.box(df, y=x, title=f"Boxplot of ({x})")
+        _add_box_traces(
+            fig,
+            box_statistics(df[x], weights=None if weight is None else df[weight]),
+            [x],
+        )
+        fig.update_layout(yaxis_title=x, title=f"Boxplot of ({x})")
 
     return fig
 
 
-def x_y_stacked(x: str, y: str, df: pd.DataFrame | None) -> go.Figure:
+def x_y_stacked(
+    x: str, y: str, df: pd.DataFrame | None, weight: str | None = None
+) -> go.Figure:
     """
     Generate a stacked bar plot with the x-axis as a categorical variable
     and y-axis as a categorical variable showing proportions.
@@ -328,21 +1006,25 @@ def x_y_stacked(x: str, y: str, df: pd.DataFrame | None) -> go.Figure:
     :param x: Column name for the x-axis (categorical variable).
     :param y: Column name for the y-axis (categorical variable).
     :param df: DataFrame containing the data.
+    :param weight: Weight column; the proportions are weighted by it (optional).
 
     :return: px.Bar instance
     """
     if df is None:
         raise ValueError("The input DataFrame is empty.")
 
-    if not isinstance(df[x], pd.CategoricalDtype):
+    if not isinstance(df[x].dtype, pd.CategoricalDtype):
         raise ValueError(f"The x-axis column '{x}' must be categorical.")
-    if not isinstance(df[y], pd.CategoricalDtype):
+    if not isinstance(df[y].dtype, pd.CategoricalDtype):
         raise ValueError(f"The y-axis column '{y}' must be categorical.")
 
-    counts = df.groupby([x, y]).size().unstack(fill_value=0)
+    if weight is None:
+        counts = df.groupby([x, y], observed=True).size().unstack(fill_value=0)
 
-    # Normalize the counts to get proportions
-    proportions = counts.div(counts.sum(axis=1), axis=0) * 100
+        # Normalize the counts to get proportions
+        proportions = counts.div(counts.sum(axis=1), axis=0) * 100
+    else:
+        proportions = _weighted_percentages(df, x, y, weight)
     # Reshape the DataFrame for Plotly
     proportions.reset_index(inplace=True)
     proportions_melted = pd.melt(
@@ -375,28 +1057,92 @@ def render_graph(
     year_range: Tuple[int, int] | None = None,
     top_k: int = 0,
     filter_list: Dict[str, Union[list, tuple, str]] | None = None,
+    weight: str | None = None,
+    standard_errors: bool = False,
 ) -> go.Figure:
     if filter_list is None:
         filter_list = {}
     if groups is None:
         groups = []
-    subset = data
-    if filter_list:
-        subset = filter_subset(subset, filter_list)
-    if year_range:
-        subset = subset[
-            subset["YEAR"].between(year_range[0], year_range[1], inclusive="both")
-        ]
-
-    plot_func_map = {
+    if standard_errors and weight is None:
+        raise ValueError("Error bars need a weight with replicate weights")
+
+    def filtered_subset(replicates: bool = False) -> pd.DataFrame:
+        # Only the plotted and grouping columns of the selected rows are
+        # gathered, instead of copying every column of the extract
+        engine = get_filter_engine(data)
+        view = engine.view(filter_list)
+        if year_range:
+            view = view.where(
+                engine.predicate_mask("YEAR", [[year_range[0], year_range[1]]])
+            )
+        columns = [x_axis, y_axis, *(column for column, _ in groups)]
+        if weight is not None:
+            columns.append(weight)
+        if replicates:
+            columns += replicate_columns(data.columns, weight)
+        return materialize(view, columns)
+
+    aggregated_plot_func_map = {
         "line": plot_line_data,
         "area": plot_area_data,
+        "grouped bar": plot_clustered_bar_data,
+    }
+    if kind in aggregated_plot_func_map:
+        # line, area and grouped bar plots share the same aggregation, which is
+        # cached so switching the chart style doesn't recompute it
+        key = aggregation_key(
+            data,
+            filter_list=filter_list,
+            year_range=year_range,
+            x_axis=x_axis,
+            y_axis=y_axis,
+            numeric_y=is_numerical(y_axis),
+            groups=groups,
+            grouping_type=grouping_type,
+            weight=weight,
+        )
+        series = aggregation_cache.get(key)
+        if series is None:
+            series = aggregate_series(
+                x_axis, y_axis, filtered_subset(), groups, grouping_type, weight
+            )
+            aggregation_cache.put(key, series)
+        errors = None
+        if standard_errors and kind in ("line", "grouped bar"):
+            # Cached apart, so turning the error bars on reuses the estimates
+            errors_key = aggregation_key(data, series_key=key, standard_errors=True)
+            errors = aggregation_cache.get(errors_key)
+            if errors is None:
+                errors = standard_error_series(
+                    x_axis,
+                    y_axis,
+                    filtered_subset(replicates=True),
+                    groups,
+                    grouping_type,
+                    weight,
+                )
+                aggregation_cache.put(errors_key, errors)
+        plot_func = aggregated_plot_func_map[kind]
+        if errors is not None:
+            plot_func = partial(plot_func, errors=errors)
+        fig = plot_func(
+            x_axis, y_axis, None, groups, grouping_type, series=series, weight=weight
+        )
+        fig.update_layout(legend=dict(orientation="h"))
+        return fig
+
+    subset = filtered_subset()
+    plot_func_map = {
         "scatter": lambda x, y, df, groups, *args: x_y_scatter(
             x=x, y=y, df=df, groups=groups
         ),
-        "box": lambda x, y, df, groups, *args: x_boxplot(x=x, df=subset, groups=groups),
-        "grouped bar": plot_clustered_bar_data,
-        "stacked bar": plot_clustered_percentage_bar_data,
+        "box": lambda x, y, df, groups, *args: x_boxplot(
+            x=x, df=subset, groups=groups, weight=weight
+        ),
+        "stacked bar": lambda *args: plot_clustered_percentage_bar_data(
+            *args, weight=weight
+        ),
     }
 
     fig = plot_func_map.get(kind, lambda *args: None)(
@@ -0,0 +1,194 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Integer columns whose value span is below this are counted with np.bincount
+# instead of hashing every row.
+BINCOUNT_MAX_SPAN = 1 << 16
+
+
+@dataclass
+class ColumnProfile:
+    """
+    Metadata computed for a single column of the extract.
+
+    Attributes:
+        name (str): Column name.
+        dtype (str): The pandas dtype of the column.
+        values (tuple): Sorted distinct non-null values.
+        null_count (int): Number of missing values.
+        cardinality (int): Number of distinct non-null values.
+        minimum: Smallest non-null value, or None for empty/unsortable columns.
+        maximum: Largest non-null value, or None for empty/unsortable columns.
+        is_numeric (bool): Whether the column is treated as a numeric variable.
+    """
+
+    name: str
+    dtype: str
+    values: tuple
+    null_count: int
+    cardinality: int
+    minimum: Any = None
+    maximum: Any = None
+    is_numeric: bool = False
+
+    @property
+    def options(self) -> tuple:
+        """
+        The values offered in selection widgets, with "nan" first when the
+        column has missing values.
+        """
+        if self.null_count:
+            return ("nan",) + self.values
+        return self.values
+
+
+@dataclass
+class DataProfile:
+    """
+    Column metadata for a whole DataFrame, shared by the UI components.
+
+    Attributes:
+        n_rows (int): Number of rows in the profiled DataFrame.
+        columns (Dict[str, ColumnProfile]): Profiles keyed by column name.
+    """
+
+    n_rows: int
+    columns: Dict[str, ColumnProfile] = field(default_factory=dict)
+
+    def __getitem__(self, name: str) -> ColumnProfile:
+        return self.columns[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+    @property
+    def numerical_attributes(self) -> List[str]:
+        return sorted(name for name, col in self.columns.items() if col.is_numeric)
+
+    @property
+    def categorical_attributes(self) -> List[str]:
+        return sorted(name for name, col in self.columns.items() if not col.is_numeric)
+
+    @property
+    def options_list(self) -> List[str]:
+        return sorted(self.columns)
+
+    @property
+    def option_value_dictionary(self) -> Dict[str, tuple]:
+        return {name: col.options for name, col in self.columns.items()}
+
+
+def _is_numeric(series: pd.Series) -> bool:
+    # Dictionary-encoded columns count as categorical even with numeric codes
+    dtype = series.dtype
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(
+        dtype
+    )
+
+
+def _sorted_distinct(values: np.ndarray):
+    try:
+        return np.sort(values), True
+    except TypeError:
+        # Mixed types can't be ordered, keep the order of appearance
+        return values, False
+
+
+def _distinct_values(series: pd.Series):
+    """
+    Return (distinct non-null values, null count, whether the values are
+    sorted) for a column.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        valid = codes >= 0
+        present = np.bincount(
+            codes[valid], minlength=len(series.cat.categories)
+        ).astype(bool)
+        values = series.cat.categories.to_numpy()[present]
+        return (*_sorted_distinct(values), int((~valid).sum()))
+
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in "iu":
+        array = series.to_numpy()
+        if array.size == 0:
+            return array, True, 0
+        low, high = array.min(), array.max()
+        if int(high) - int(low) < BINCOUNT_MAX_SPAN:
+            offsets = np.subtract(array, low, dtype=np.int64)
+            present = np.bincount(offsets).astype(bool)
+            return (np.flatnonzero(present) + low).astype(array.dtype), True, 0
+        return np.unique(array), True, 0
+
+    nulls = series.isna().to_numpy()
+    null_count = int(nulls.sum())
+    non_null = series[~nulls] if null_count else series
+    values = pd.unique(non_null)
+    if isinstance(values, pd.api.extensions.ExtensionArray):
+        values = values.to_numpy()
+    if values.dtype == object:
+        # Colab extracts sometimes carry missing values as the literal "nan"
+        is_nan_string = values == "nan"
+        if is_nan_string.any():
+            values = values[~is_nan_string]
+            null_count += int((non_null == "nan").sum())
+    return (*_sorted_distinct(values), null_count)
+
+
+def profile_column(series: pd.Series) -> ColumnProfile:
+    """
+    Compute the metadata of a single column.
+
+    Parameters:
+    series (pd.Series): The column to profile.
+
+    Returns:
+    ColumnProfile: Distinct values, null count, min/max and cardinality.
+    """
+    values, ordered, null_count = _distinct_values(series)
+    values = tuple(values if values.dtype.kind in "mM" else values.tolist())
+    minimum = maximum = None
+    if ordered and values:
+        minimum, maximum = values[0], values[-1]
+
+    return ColumnProfile(
+        name=series.name,
+        dtype=str(series.dtype),
+        values=values,
+        null_count=null_count,
+        cardinality=len(values),
+        minimum=minimum,
+        maximum=maximum,
+        is_numeric=_is_numeric(series),
+    )
+
+
+def profile_dataframe(df: pd.DataFrame, max_workers: int | None = None) -> DataProfile:
+    """
+    Profile every column of the DataFrame, in parallel across columns.
+
+    Parameters:
+    df (pd.DataFrame): The extract to profile.
+    max_workers (int): Number of worker threads, defaults to the CPU count.
+
+    Returns:
+    DataProfile: The metadata object read by the selection and plotting menus.
+    """
+    if max_workers is None:
+        max_workers = min(8, os.cpu_count() or 1)
+
+    columns = list(df.columns)
+    if max_workers > 1 and len(columns) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            profiles = list(executor.map(lambda c: profile_column(df[c]), columns))
+    else:
+        profiles = [profile_column(df[c]) for c in columns]
+
+    return DataProfile(
+        n_rows=len(df),
+        columns={profile.name: profile for profile in profiles},
+    )
@@ -0,0 +1,103 @@
+from collections import defaultdict
+from typing import Dict, List
+
+import numpy as np
+
+from .profiling import DataProfile
+
+# Length of the substrings indexed by ValueSearchIndex. Shorter queries are
+# answered by scanning the lowercased values.
+NGRAM_SIZE = 3
+
+
+class ValueSearchIndex:
+    """
+    Case-insensitive substring search over the distinct values of a column.
+
+    The values are lowercased once and every trigram is mapped to the sorted
+    positions of the values containing it. A query intersects the posting
+    lists of its trigrams and only checks the few remaining candidates. When
+    the query extends the previous one (typing one more character), only the
+    previous matches are searched.
+
+    Attributes:
+    values (list): The distinct values, in the order results are returned.
+    """
+
+    def __init__(self, values):
+        self.values = list(values)
+        self._lowered = [str(value).lower() for value in self.values]
+        self._postings = None
+        self._last_query = None
+        self._last_matches = None
+
+    def _build_postings(self) -> Dict[str, np.ndarray]:
+        postings = defaultdict(list)
+        for position, text in enumerate(self._lowered):
+            for gram in {
+                text[i : i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)
+            }:
+                postings[gram].append(position)
+        return {gram: np.array(rows, dtype=np.int64) for gram, rows in postings.items()}
+
+    def _candidates(self, query: str) -> np.ndarray | None:
+        if len(query) < NGRAM_SIZE:
+            return None
+        if self._postings is None:
+            self._postings = self._build_postings()
+        grams = {query[i : i + NGRAM_SIZE] for i in range(len(query) - NGRAM_SIZE + 1)}
+        lists = sorted(
+            (self._postings.get(gram, np.empty(0, dtype=np.int64)) for gram in grams),
+            key=len,
+        )
+        candidates = lists[0]
+        for rows in lists[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, rows, assume_unique=True)
+        return candidates
+
+    def search(self, text: str) -> List:
+        """
+        Return the values containing `text`, ignoring case.
+
+        Parameters:
+        text (str): The search text, every value matches an empty text.
+
+        Returns:
+        list: The matching values, in the order of `values`.
+        """
+        query = text.lower()
+        if not query:
+            return list(self.values)
+
+        if self._last_query is not None and query.startswith(self._last_query):
+            candidates = self._last_matches
+        else:
+            candidates = self._candidates(query)
+            if candidates is None:
+                candidates = range(len(self._lowered))
+
+        matches = [
+            position for position in candidates if query in self._lowered[position]
+        ]
+        self._last_query, self._last_matches = query, matches
+        return [self.values[position] for position in matches]
+
+
+_indexes = {}
+_indexed_profile = None
+
+
+def get_search_index(profile: DataProfile, column: str) -> ValueSearchIndex:
+    """
+    Return the search index of a column, building it from the profile on
+    first use. The indexes are dropped when a different profile is passed.
+    """
+    global _indexed_profile
+    if _indexed_profile is not profile:
+        _indexes.clear()
+        _indexed_profile = profile
+    if column not in _indexes:
+        _indexes[column] = ValueSearchIndex(profile[column].values)
+    return _indexes[column]
@@ -0,0 +1,88 @@
+import os
+import pickle
+from typing import List
+
+import pandas as pd
+
+from .profiling import DataProfile
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow.feather as feather
+    except ImportError as error:
+        raise ImportError(
+            "The session store requires pyarrow: pip install pyarrow"
+        ) from error
+    return feather
+
+
+class SessionStore:
+    """
+    Columnar copy of a loaded extract, reopened memory-mapped in later sessions.
+
+    The DataFrame is written as an uncompressed Arrow IPC (Feather v2) file so
+    that reopening maps the file instead of reading it: numeric columns are
+    wrapped without copying and only the pages of the columns that filters and
+    plots actually touch are read from disk. The column profile is stored
+    next to it.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+
+    @property
+    def profile_path(self) -> str:
+        return f"{self.path}.profile.pkl"
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def save(self, df: pd.DataFrame):
+        """
+        Write the DataFrame to the store, replacing any previous content.
+
+        Parameters:
+        df (pd.DataFrame): The (type-optimized) extract.
+        """
+        feather = _require_pyarrow()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        feather.write_feather(df, temp_path, compression="uncompressed")
+        os.replace(temp_path, self.path)
+        if os.path.exists(self.profile_path):
+            os.remove(self.profile_path)
+
+    def open(self, columns: List[str] | None = None) -> pd.DataFrame:
+        """
+        Reopen the stored DataFrame memory-mapped.
+
+        Parameters:
+        columns (list): Columns to load, every column when omitted.
+
+        Returns:
+        pd.DataFrame: The stored extract.
+        """
+        feather = _require_pyarrow()
+        if not self.exists():
+            raise FileNotFoundError(f"No session store at {self.path}")
+        table = feather.read_table(self.path, columns=columns, memory_map=True)
+        # One block per column lets pyarrow hand out zero-copy views
+        return table.to_pandas(split_blocks=True)
+
+    def save_profile(self, profile: DataProfile):
+        with open(self.profile_path, "wb") as file:
+            pickle.dump(profile, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load_profile(self) -> DataProfile | None:
+        """
+        Return the profile stored with the session, or None if there is none.
+        """
+        try:
+            with open(self.profile_path, "rb") as file:
+                profile = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+        return profile if isinstance(profile, DataProfile) else None
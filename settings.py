@@ -7,3 +7,19 @@ categorical_attributes = []
 options_list = []
 option_value_dictionary = {}
 csm = None
+profile = None
+weight = None
+
+
+def is_numerical(column) -> bool:
+    # run() rebinds numerical_attributes only inside the package __init__,
+    # so the profile it stores here is what the other modules must read
+    if profile is not None:
+        return column in profile and profile[column].is_numeric
+    return column in numerical_attributes
+
+
+def numerical_columns() -> list:
+    if profile is not None:
+        return profile.numerical_attributes
+    return list(numerical_attributes)
@@ -0,0 +1,274 @@
+from typing import Dict, Iterable, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from .filter_data import FilteredView
+from .weights import weight_array
+
+# Centroids kept per sketch; quantile errors shrink roughly as 1/compression,
+# most near the median, least in the tails.
+SKETCH_COMPRESSION = 200
+
+# Rows read per pass of sketch_columns.
+SKETCH_CHUNK_ROWS = 500_000
+
+SUMMARY_QUANTILES = (0.25, 0.5, 0.75)
+
+
+class QuantileSketch:
+    """
+    Mergeable, weighted t-digest style summary of a numeric column.
+
+    The values are kept as at most ~`compression` centroids (mean, weight),
+    sorted by mean. A centroid may only absorb values whose quantiles lie
+    close together on the arcsine scale, so centroids stay small in the
+    tails and extreme quantiles remain accurate. Updating or merging
+    concatenates the centroids and re-compresses them in one vectorized
+    pass, so the memory used does not depend on the number of rows. The
+    count, weighted mean and variance are kept exactly.
+
+    Attributes:
+    compression (int): Upper bound on the number of centroids.
+    count (int): Number of non-missing values seen.
+    total_weight (float): Sum of their weights.
+    minimum (float): Smallest value, NaN while empty.
+    maximum (float): Largest value, NaN while empty.
+    """
+
+    def __init__(self, compression: int = SKETCH_COMPRESSION):
+        self.compression = compression
+        self.count = 0
+        self.total_weight = 0.0
+        self.minimum = np.nan
+        self.maximum = np.nan
+        self._mean = 0.0
+        # Weighted sum of squared deviations from the mean
+        self._squares = 0.0
+        self._means = np.empty(0)
+        self._weights = np.empty(0)
+
+    def _add_moments(self, count: int, weight: float, mean: float, squares: float):
+        # Chan et al.'s parallel update, stable for large values and counts
+        total = self.total_weight + weight
+        delta = mean - self._mean
+        self._squares += squares + delta**2 * self.total_weight * weight / total
+        self._mean += delta * weight / total
+        self.total_weight = total
+        self.count += count
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray):
+        # means must be sorted
+        cumulative = np.cumsum(weights)
+        centers = (cumulative - weights / 2) / cumulative[-1]
+        # Every centroid lands in the unit of the arcsine scale its centre
+        # falls in, the units of the scale being narrow in the tails
+        scale = self.compression / np.pi * np.arcsin(2 * centers - 1)
+        bins = np.floor(scale).astype(np.int64)
+        _, groups = np.unique(bins, return_inverse=True)
+        merged_weights = np.bincount(groups, weights=weights)
+        self._means = np.bincount(groups, weights=means * weights) / merged_weights
+        self._weights = merged_weights
+
+    def update(self, values, weights=None) -> "QuantileSketch":
+        """
+        Add values to the sketch; missing values and rows without weight are
+        skipped.
+
+        Parameters:
+        values (array-like): The values.
+        weights (array-like): Their weights, 1 for every value when omitted.
+
+        Returns:
+        QuantileSketch: The sketch itself.
+        """
+        values = np.asarray(values, dtype=float)
+        if weights is None:
+            values = np.sort(values[~np.isnan(values)])
+            weights = np.ones(len(values))
+        else:
+            weights = np.asarray(weights, dtype=float)
+            keep = ~np.isnan(values) & (weights > 0)
+            values, weights = values[keep], weights[keep]
+            order = np.argsort(values)
+            values, weights = values[order], weights[order]
+        if not len(values):
+            return self
+
+        weight = weights.sum()
+        mean = np.dot(weights, values) / weight
+        squares = np.dot(weights, (values - mean) ** 2)
+        self._add_moments(len(values), weight, mean, squares)
+        self.minimum = np.fmin(self.minimum, values[0])
+        self.maximum = np.fmax(self.maximum, values[-1])
+        # The few centroids are inserted into the sorted chunk rather than
+        # sorting everything again
+        positions = np.searchsorted(values, self._means)
+        self._compress(
+            np.insert(values, positions, self._means),
+            np.insert(weights, positions, self._weights),
+        )
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """
+        Return a new sketch summarizing the values of both sketches, e.g. to
+        combine per-chunk or per-year sketches.
+        """
+        merged = QuantileSketch(max(self.compression, other.compression))
+        for sketch in (self, other):
+            if sketch.count:
+                merged._add_moments(
+                    sketch.count, sketch.total_weight, sketch._mean, sketch._squares
+                )
+                merged.minimum = np.fmin(merged.minimum, sketch.minimum)
+                merged.maximum = np.fmax(merged.maximum, sketch.maximum)
+        if merged.count:
+            means = np.concatenate([self._means, other._means])
+            weights = np.concatenate([self._weights, other._weights])
+            order = np.argsort(means, kind="stable")
+            merged._compress(means[order], weights[order])
+        return merged
+
+    @property
+    def mean(self) -> float:
+        return self._mean if self.count else np.nan
+
+    @property
+    def std(self) -> float:
+        """
+        Weighted standard deviation with frequency weights, which is the
+        sample standard deviation of pandas when every weight is 1.
+        """
+        if self.total_weight <= 1:
+            return np.nan
+        return float(np.sqrt(self._squares / (self.total_weight - 1)))
+
+    def quantiles(self, quantiles: Sequence[float]) -> np.ndarray:
+        """
+        Approximate weighted quantiles, interpolated between the centroid
+        centres and the exact minimum and maximum.
+
+        Parameters:
+        quantiles (list): Requested quantiles between 0 and 1.
+
+        Returns:
+        np.ndarray: The quantiles, NaN while the sketch is empty.
+        """
+        quantiles = np.asarray(quantiles, dtype=float)
+        if not self.count:
+            return np.full(quantiles.shape, np.nan)
+        cumulative = np.cumsum(self._weights)
+        centers = cumulative - self._weights / 2
+        return np.interp(
+            quantiles * cumulative[-1],
+            np.concatenate([[0.0], centers, [cumulative[-1]]]),
+            np.concatenate([[self.minimum], self._means, [self.maximum]]),
+        )
+
+    def quantile(self, quantile: float) -> float:
+        return float(self.quantiles([quantile])[0])
+
+
+def merge_sketches(sketches: Iterable[QuantileSketch]) -> QuantileSketch:
+    """
+    Merge sketches of disjoint parts of the data into one.
+    """
+    merged = QuantileSketch()
+    for sketch in sketches:
+        merged = merged.merge(sketch)
+    return merged
+
+
+def sketch_columns(
+    data: Union[pd.DataFrame, FilteredView],
+    columns: Iterable[str],
+    weight: str | None = None,
+    chunk_rows: int = SKETCH_CHUNK_ROWS,
+    compression: int = SKETCH_COMPRESSION,
+) -> Dict[str, QuantileSketch]:
+    """
+    Sketch every column in a single pass over the rows, reading
+    `chunk_rows` rows of the requested columns at a time.
+
+    Parameters:
+    data (pd.DataFrame | FilteredView): The (filtered) data.
+    columns (list): The numeric columns to sketch.
+    weight (str): Weight column, every row weighs 1 when omitted.
+    chunk_rows (int): Rows per chunk.
+    compression (int): Compression of the sketches.
+
+    Returns:
+    dict[str, QuantileSketch]: The sketch of every column.
+    """
+    view = data if isinstance(data, FilteredView) else FilteredView(data)
+    columns = [column for column in columns if column in view.columns]
+    sketches = {column: QuantileSketch(compression) for column in columns}
+    read = [*columns, *([weight] if weight and weight not in columns else [])]
+    for chunk in view.iter_chunks(read, chunk_rows=chunk_rows):
+        weights = weight_array(chunk, weight)
+        for column in columns:
+            sketches[column].update(chunk[column].to_numpy(dtype=float), weights)
+    return sketches
+
+
+def sketch_by(
+    data: Union[pd.DataFrame, FilteredView],
+    by: str,
+    columns: Iterable[str],
+    weight: str | None = None,
+    chunk_rows: int = SKETCH_CHUNK_ROWS,
+    compression: int = SKETCH_COMPRESSION,
+) -> Dict[object, Dict[str, QuantileSketch]]:
+    """
+    Sketch every column separately for every value of `by` (e.g. YEAR) in a
+    single pass. Merging the sketches of some values summarizes that
+    sub-selection without reading the rows again.
+
+    Returns:
+    dict: The sketches of every column, per value of `by`.
+    """
+    view = data if isinstance(data, FilteredView) else FilteredView(data)
+    columns = [column for column in columns if column in view.columns]
+    sketches = {}
+    read = list(dict.fromkeys([by, *columns, *([weight] if weight else [])]))
+    for chunk in view.iter_chunks(read, chunk_rows=chunk_rows):
+        weights = weight_array(chunk, weight)
+        codes, keys = pd.factorize(chunk[by])
+        for code, key in enumerate(keys):
+            rows = np.flatnonzero(codes == code)
+            group = sketches.setdefault(
+                key, {column: QuantileSketch(compression) for column in columns}
+            )
+            for column in columns:
+                group[column].update(
+                    chunk[column].to_numpy(dtype=float)[rows],
+                    None if weights is None else weights[rows],
+                )
+    return sketches
+
+
+def sketch_summary(sketches: Dict[str, QuantileSketch]) -> pd.DataFrame:
+    """
+    Lay out sketches like DataFrame.describe().transpose(): one row per
+    column with count, mean, std, min, quartiles and max.
+    """
+    labels = [f"{quantile * 100:g}%" for quantile in SUMMARY_QUANTILES]
+    rows = []
+    for sketch in sketches.values():
+        rows.append(
+            [
+                sketch.count,
+                sketch.mean,
+                sketch.std,
+                sketch.minimum,
+                *sketch.quantiles(SUMMARY_QUANTILES),
+                sketch.maximum,
+            ]
+        )
+    return pd.DataFrame(
+        rows,
+        index=list(sketches.keys()),
+        columns=["count", "mean", "std", "min", *labels, "max"],
+        dtype=float,
+    )
@@ -8,46 +8,60 @@ from functools import reduce
 from data_processing import delete_selections, numeric_selections
 
 from .settings import *
+from . import settings
 
 from ipywidgets import interact, widgets, Layout
 import pandas as pd
 
 from IPython.display import display, clear_output
 
-from .describe_data import count_table, summary_statistics
-from .filter_data import filter_dataframe
+from .background import BackgroundRunner, debounce
+from .describe_data import (
+    count_table_outputs,
+    frequency_cube_outputs,
+    summary_statistics_outputs,
+)
+from .export_data import (
+    ROW_EXPORT_FORMATS,
+    download_file,
+    export_rows,
+    row_export_path,
+)
+from .filter_data import filter_dataframe, get_incremental_filter
 from .plotting import render_graph
+from .search_index import get_search_index
+from .variance import replicate_columns
+from .weights import available_weights
 from .widgets import FilterOptionWidget
 
+# Pause in typing after which the value search runs.
+SEARCH_DEBOUNCE_SECONDS = 0.2
+
 
 def create_ui(df, categorical_attributes):
     search_text = ""
     selected_category = categorical_attributes[0]
 
     def get_filtered_values(search_text, selected_category):
-        if search_text:
-            return [
-                value
-                for value in df[selected_category].unique()
-                if search_text.lower() in str(value).lower()
-            ]
-        else:
-            return df[selected_category].unique().tolist()
+        # The profile values are already sorted, and so are the results
+        return get_search_index(settings.profile, selected_category).search(search_text)
 
+    filtered_values = get_filtered_values(search_text, selected_category)
     value_selection = widgets.SelectMultiple(
-        options=sorted(get_filtered_values(search_text, selected_category)),
+        options=filtered_values,
         value=(),
         description="Values:",
         disabled=False,
-        rows=min(5, len(get_filtered_values(search_text, selected_category))),
+        rows=min(5, len(filtered_values)),
         layout=Layout(width="70%", height="300px"),
         style={"font-size": "40px"},
     )
 
+    @debounce(SEARCH_DEBOUNCE_SECONDS)
     def update_value_selection():
         nonlocal search_text, selected_category
         filtered_values = get_filtered_values(search_text, selected_category)
-        value_selection.options = sorted(filtered_values)
+        value_selection.options = filtered_values
         value_selection.rows = min(5, len(filtered_values))
         value_selection.value = ()  # tuple(filtered_values)
 
@@ -146,6 +160,10 @@ def create_ui(df, categorical_attributes):
 def plotting(data, filter_list):
     global grouping_list
 
+    profile = settings.profile
+    options_list = profile.options_list
+    numerical_attributes = profile.numerical_attributes
+
     output_widget = widgets.Output()
     style = {"description_width": "initial"}
     grouping_list = []
@@ -166,7 +184,7 @@ def plotting(data, filter_list):
     grouping_variable = widgets.Dropdown(
         options=options_list, description="Group variable:", style=style
     )
-    grouping_variable_options = option_value_dictionary
+    grouping_variable_options = profile.option_value_dictionary
 
     grouping_variable_values = widgets.SelectMultiple(
         options=[],
@@ -182,10 +200,31 @@ def plotting(data, filter_list):
         style=style,
     )
 
-    def update_output(fig):
-        with output_widget:
-            output_widget.clear_output(wait=True)
-            fig.show()
+    weights = available_weights(data.columns)
+    # A custom weight passed to run() is offered alongside PERWT and HHWT
+    if settings.weight in data.columns and settings.weight not in weights:
+        weights.append(settings.weight)
+    weight_options = [("None", None)] + [(column, column) for column in weights]
+    weight_variable = widgets.Dropdown(
+        options=weight_options,
+        value=settings.weight if settings.weight in weights else None,
+        description="Weight:",
+        style=style,
+    )
+    error_bars = widgets.Checkbox(
+        value=False, description="Error bars (replicate weights)", style=style
+    )
+
+    def update_error_bars(change=None):
+        # Error bars are only offered for weights that have replicate weights
+        if replicate_columns(data.columns, weight_variable.value):
+            error_bars.layout.visibility = "visible"
+        else:
+            error_bars.value = False
+            error_bars.layout.visibility = "hidden"
+
+    weight_variable.observe(update_error_bars, names=["value"])
+    update_error_bars()
 
     def update_grouping_options(change):
         selected_option = change.new
@@ -242,19 +281,34 @@ def plotting(data, filter_list):
     make_plot_button = widgets.Button(
         description="Make plot", button_style="info", style=style
     )
-    make_plot_button.on_click(
-        lambda x: update_output(
-            render_graph(
-                data,
-                plot_type.value,
-                x_axis.value,
-                y_axis.value,
-                grouping_list,
-                grouping_type.value,
-                filter_list=filter_list,
-            )
+    runner = BackgroundRunner(output_widget)
+
+    def make_plot(button):
+        # Read the widgets now, the plot is rendered in the background
+        arguments = (
+            data,
+            plot_type.value,
+            x_axis.value,
+            y_axis.value,
+            list(grouping_list),
+            grouping_type.value,
+        )
+        weight = weight_variable.value
+        standard_errors = error_bars.value
+        selection = {
+            attribute: list(values) for attribute, values in filter_list.items()
+        }
+        runner.submit(
+            lambda: render_graph(
+                *arguments,
+                filter_list=selection,
+                weight=weight,
+                standard_errors=standard_errors,
+            ),
+            message="Rendering the plot...",
         )
-    )
+
+    make_plot_button.on_click(make_plot)
 
     done_button = widgets.Button(description="Done", button_style="warning")
     done_button.on_click(lambda x: main_menu(data))
@@ -265,6 +319,7 @@ def plotting(data, filter_list):
             widgets.HBox([plot_type, make_plot_button]),
             widgets.HBox([x_axis]),
             widgets.HBox([y_axis, done_button]),
+            widgets.HBox([weight_variable, error_bars]),
         ]
     )
     grouping_layout = widgets.VBox(
@@ -380,6 +435,64 @@ def make_selection_menu(df: pd.DataFrame):
     display(dropdown, finish_button)
 
 
+def export_rows_form(df: pd.DataFrame, selected_view, executor=None):
+    """
+    Build the widgets exporting the selected rows to a compressed file. The
+    progress and the result are shown below the form, which stays usable
+    for further exports.
+
+    Parameters:
+    df (pd.DataFrame): The unfiltered data, whose columns are offered.
+    selected_view (Callable): Returns the FilteredView of the selection.
+    executor (Executor): Runs the export, the shared background worker when
+    omitted.
+
+    Returns:
+    list: The widgets to display.
+    """
+    columns = widgets.SelectMultiple(
+        options=list(df.columns),
+        value=tuple(df.columns),
+        description="Columns:",
+        rows=min(10, len(df.columns)),
+    )
+    file_format = widgets.Dropdown(options=ROW_EXPORT_FORMATS, description="Format:")
+    export_button = widgets.Button(description="Export", button_style="info")
+    export_output = widgets.Output()
+    runner = BackgroundRunner(export_output, executor)
+
+    def export(button):
+        chosen_columns, chosen_format = list(columns.value), file_format.value
+        progress_bar = widgets.FloatProgress(min=0, max=1, description="0%")
+
+        def report(written, total):
+            progress_bar.value = written / total if total else 1
+            progress_bar.description = f"{progress_bar.value:.0%}"
+
+        def render(path):
+            download_button = widgets.Button(description="Download")
+            download_button.on_click(lambda x: download_file(path))
+            return [f"Exported the selection to {path}", download_button]
+
+        runner.submit(
+            # The path is taken on the worker, after any earlier export of
+            # the shared directory has finished
+            lambda: export_rows(
+                selected_view(),
+                row_export_path(chosen_format),
+                chosen_columns,
+                file_format=chosen_format,
+                progress=report,
+            ),
+            render,
+            message="Exporting rows...",
+            progress=progress_bar,
+        )
+
+    export_button.on_click(export)
+    return [columns, widgets.HBox([file_format, export_button]), export_output]
+
+
 def desdcribe_selection_menu(df: pd.DataFrame):
     global csm
     csm.set_state("Describe Selection")
@@ -392,28 +505,75 @@ def desdcribe_selection_menu(df: pd.DataFrame):
     for attribute, value in selections.items():
         print(f"{attribute}: {value}")
     global filtered_df
-    filtered_df = filter_dataframe(df, selections)
+    filtered_df = None
+
+    output_widget = widgets.Output()
+    runner = BackgroundRunner(output_widget)
+
+    def selected_view(selection):
+        global filtered_df
+        if filtered_df is None:
+            filtered_df = get_incremental_filter(df).view(selection)
+        return filtered_df
 
     def selection_mode(button):
         global filtered_df
         global selections
 
-        if filtered_df is None:
-            filtered_df = filter_dataframe(df, selections)
         # try:
         chosen = dropdown.value
+        # Copied so the background task is not affected by later edits
+        current = {attribute: list(values) for attribute, values in selections.items()}
         if chosen == "1":
-            display(filtered_df.head(10))
-            desdcribe_selection_menu(df)
+            runner.submit(
+                lambda: selected_view(current).head(10), message="Filtering..."
+            )
         elif chosen == "2":
-            summary_statistics(filtered_df)
-            desdcribe_selection_menu(df)
+            runner.submit(
+                lambda: summary_statistics_outputs(selected_view(current)),
+                message="Computing summary statistics...",
+            )
+        elif chosen == "9":
+            runner.submit(
+                lambda: summary_statistics_outputs(
+                    selected_view(current), approximate=True, weight=settings.weight
+                ),
+                message="Sketching the numeric attributes...",
+            )
         elif chosen == "3":
-            count_table(filtered_df, selections)
-            desdcribe_selection_menu(df)
+            runner.submit(
+                lambda: count_table_outputs(
+                    selected_view(current), current, settings.weight
+                ),
+                message="Counting...",
+            )
+        elif chosen == "8":
+            runner.submit(
+                lambda: count_table_outputs(
+                    selected_view(current),
+                    current,
+                    settings.weight,
+                    standard_errors=True,
+                ),
+                message="Estimating standard errors...",
+            )
+        elif chosen == "6":
+            runner.submit(
+                lambda: frequency_cube_outputs(
+                    selected_view(current), current, settings.weight
+                ),
+                message="Building the frequency cube...",
+            )
+        elif chosen == "7":
+            runner.cancel()
+            runner.show(
+                *export_rows_form(df, lambda: selected_view(current), runner.executor)
+            )
         elif chosen == "4":
+            runner.cancel()
             main_menu(df)
         elif chosen == "5":
+            runner.cancel()
             filtered_df = None
             selections = {}
             main_menu(df)
@@ -425,10 +585,17 @@ def desdcribe_selection_menu(df: pd.DataFrame):
     state_options = {
         "First 10 Lines": "1",
         "Summary statistics": "2",
+        "Approximate summary statistics": "9",
         "Frequency Table": "3",
+        "Frequency Table with SE": "8",
+        "Frequency Cube": "6",
+        "Export Rows": "7",
         "Keep Dataframe": "4",
         "Discard Dataframe": "5",
     }
+    # Standard errors need the replicate weights of the session weight
+    if not replicate_columns(df.columns, settings.weight):
+        del state_options["Frequency Table with SE"]
 
     # Create dropdown widget
     dropdown = widgets.Dropdown(options=state_options, description="Select mode:")
@@ -440,4 +607,4 @@ def desdcribe_selection_menu(df: pd.DataFrame):
     finish_button.on_click(selection_mode)
 
     # Display the dropdown and buttons
-    display(dropdown, finish_button)
+    display(dropdown, finish_button, output_widget)
@@ -0,0 +1,253 @@
+import re
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .crosstab import factorize_column
+
+# Prefix of the replicate weights that go with each IPUMS weight variable.
+REPLICATE_PREFIXES = {"PERWT": "REPWTP", "HHWT": "REPWT"}
+
+# Rows read at a time; bounds the (rows x replicates) weight block held in
+# memory.
+VARIANCE_CHUNK_ROWS = 250_000
+
+
+def replicate_columns(columns, weight: str) -> List[str]:
+    """
+    Return the replicate weight columns of a weight variable, in replicate
+    order (REPWTP1, REPWTP2, ..., REPWTP80 for PERWT).
+
+    Parameters:
+    columns (list): The available columns.
+    weight (str): The full-sample weight, PERWT or HHWT.
+
+    Returns:
+    list[str]: The replicate columns, empty when there are none.
+    """
+    prefix = REPLICATE_PREFIXES.get(weight)
+    if prefix is None:
+        return []
+    pattern = re.compile(rf"{prefix}(\d+)")
+    numbered = []
+    for column in columns:
+        match = pattern.fullmatch(str(column))
+        if match:
+            numbered.append((int(match.group(1)), column))
+    return [column for _, column in sorted(numbered)]
+
+
+def replicate_standard_errors(
+    estimates: np.ndarray, replicates: np.ndarray
+) -> np.ndarray:
+    """
+    Successive difference replication standard errors, as documented for
+    the ACS: SE = sqrt(4 / R * sum_r (X_r - X)^2) with R replicates.
+
+    Parameters:
+    estimates (np.ndarray): Full-sample estimates, any shape.
+    replicates (np.ndarray): The replicate estimates, shape + (R,).
+
+    Returns:
+    np.ndarray: The standard errors, shaped like `estimates`.
+    """
+    n_replicates = replicates.shape[-1]
+    squared = (replicates - estimates[..., None]) ** 2
+    return np.sqrt(4 / n_replicates * squared.sum(axis=-1))
+
+
+def grouped_replicate_totals(
+    df: pd.DataFrame,
+    codes: np.ndarray,
+    size: int,
+    weight: str,
+    values: np.ndarray | None = None,
+    chunk_rows: int = VARIANCE_CHUNK_ROWS,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sum the full-sample and every replicate weight (times `values`) per code.
+
+    The full weight and the R replicate weights are treated as one
+    (rows x (R + 1)) matrix, so all the estimates of a block of rows come
+    from one grouped reduction: the rows are sorted by code and every run
+    of a code is summed with np.add.reduceat. Rows are processed in blocks
+    of `chunk_rows`, so memory depends on the block size only, not on the
+    number of rows or groups.
+
+    Parameters:
+    df (pd.DataFrame): The data with the weight and replicate columns.
+    codes (np.ndarray): Group code of every row, -1 to leave a row out. A
+    (k, rows) array places every row in up to k groups at once.
+    size (int): Number of groups.
+    weight (str): The full-sample weight, PERWT or HHWT.
+    values (np.ndarray): Values to total, weights are totalled when omitted.
+    Missing values leave their row out.
+    chunk_rows (int): Rows per block.
+
+    Returns:
+    Tuple[np.ndarray, np.ndarray]: The full-sample totals (size,) and the
+    replicate totals (size, R).
+    """
+    columns = [weight, *replicate_columns(df.columns, weight)]
+    if len(columns) == 1:
+        raise ValueError(f"No replicate weights found for {weight!r}")
+    arrays = [df[column].to_numpy() for column in columns]
+
+    codes = np.atleast_2d(codes)
+    if values is not None:
+        codes = np.where(np.isnan(values), -1, codes)
+    totals = np.zeros((size, len(columns)))
+    for start in range(0, codes.shape[1], chunk_rows):
+        block = slice(start, start + chunk_rows)
+        block_codes = codes[:, block]
+        rows = np.flatnonzero((block_codes >= 0).any(axis=0))
+        if not len(rows):
+            continue
+        matrix = np.column_stack([array[block][rows] for array in arrays]).astype(float)
+        matrix = np.nan_to_num(matrix, nan=0.0)
+        if values is not None:
+            matrix *= values[block][rows, None]
+        for membership in block_codes[:, rows]:
+            member = np.flatnonzero(membership >= 0)
+            if not len(member):
+                continue
+            order = member[np.argsort(membership[member], kind="stable")]
+            ordered_codes = membership[order]
+            starts = np.flatnonzero(np.diff(ordered_codes, prepend=-1))
+            totals[ordered_codes[starts]] += np.add.reduceat(
+                matrix[order], starts, axis=0
+            )
+    return totals[:, 0], totals[:, 1:]
+
+
+def total_standard_errors(
+    df: pd.DataFrame,
+    codes: np.ndarray,
+    size: int,
+    weight: str,
+    values: np.ndarray | None = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Weighted totals (population counts, or sums of `values`) per code and
+    their replicate standard errors.
+
+    Returns:
+    Tuple[np.ndarray, np.ndarray]: The estimates and standard errors.
+    """
+    full, replicates = grouped_replicate_totals(df, codes, size, weight, values)
+    return full, replicate_standard_errors(full, replicates)
+
+
+def mean_standard_errors(
+    df: pd.DataFrame,
+    codes: np.ndarray,
+    size: int,
+    weight: str,
+    values: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Weighted means of `values` per code and their replicate standard errors;
+    every replicate mean is the ratio of that replicate's totals.
+
+    Returns:
+    Tuple[np.ndarray, np.ndarray]: The estimates and standard errors.
+    """
+    present = np.where(np.isnan(values), -1, codes)
+    full_sums, replicate_sums = grouped_replicate_totals(
+        df, codes, size, weight, values
+    )
+    full_weights, replicate_weights = grouped_replicate_totals(
+        df, present, size, weight
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        full = full_sums / full_weights
+        replicates = replicate_sums / replicate_weights
+    return full, replicate_standard_errors(full, replicates)
+
+
+def value_count_standard_errors(
+    table: pd.DataFrame, df: pd.DataFrame, column: str, weight: str
+) -> pd.DataFrame:
+    """
+    Add an "SE" column to a weighted value_count_table.
+
+    Parameters:
+    table (pd.DataFrame): The table built by value_count_table.
+    df (pd.DataFrame): The data it was counted from, with replicate weights.
+    column (str): The counted attribute.
+    weight (str): The full-sample weight the table was weighted by.
+
+    Returns:
+    pd.DataFrame: A copy of the table with the standard error of every count.
+    """
+    codes, uniques = factorize_column(df[column])
+    _, errors = total_standard_errors(df, codes, len(uniques), weight)
+    table = table.copy()
+    table["SE"] = pd.Series(errors, index=uniques).reindex(table[column]).to_numpy()
+    return table
+
+
+def pairwise_standard_error_tables(
+    df: pd.DataFrame, selections: dict, tables: List[pd.DataFrame], weight: str
+) -> List[pd.DataFrame]:
+    """
+    Build the standard errors of every pairwise frequency table, laid out
+    like the table itself including the "Total" row and column.
+
+    The cells, row totals, column totals and grand total of a pair are
+    estimated in a single pass over the replicate weights.
+
+    Parameters:
+    df (pd.DataFrame): The data with the weight and replicate columns.
+    selections (dict): The selections the tables were built from.
+    tables (list[pd.DataFrame]): The tables of pairwise_count_tables.
+    weight (str): The full-sample weight the tables were weighted by.
+
+    Returns:
+    List[pd.DataFrame]: One standard error table per count table.
+    """
+    factorized = {column: factorize_column(df[column]) for column in selections}
+    error_tables = []
+    for table in tables:
+        column_a, column_b = table.index.name, table.columns.name
+        codes_a, values_a = factorized[column_a]
+        codes_b, values_b = factorized[column_b]
+        size_a, size_b = len(values_a), len(values_b)
+        n_cells = size_a * size_b
+
+        # Row and column totals only count rows present in both columns
+        valid = (codes_a >= 0) & (codes_b >= 0)
+        membership = np.where(
+            valid,
+            [
+                codes_a * size_b + codes_b,
+                n_cells + codes_a,
+                n_cells + size_a + codes_b,
+                np.full(len(codes_a), n_cells + size_a + size_b),
+            ],
+            -1,
+        )
+        _, errors = total_standard_errors(
+            df, membership, n_cells + size_a + size_b + 1, weight
+        )
+
+        rows, columns = table.index[:-1], table.columns[:-1]
+        errors_table = pd.DataFrame(
+            errors[:n_cells].reshape(size_a, size_b),
+            index=values_a,
+            columns=values_b,
+        ).reindex(index=rows, columns=columns)
+        errors_table["Total"] = (
+            pd.Series(errors[n_cells : n_cells + size_a], index=values_a)
+            .reindex(rows)
+            .to_numpy()
+        )
+        errors_table.loc["Total"] = [
+            *pd.Series(errors[n_cells + size_a : -1], index=values_b).reindex(columns),
+            errors[-1],
+        ]
+        errors_table.index.name = column_a
+        errors_table.columns.name = f"{column_b} SE"
+        error_tables.append(errors_table)
+    return error_tables
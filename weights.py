@@ -0,0 +1,165 @@
+from typing import Iterable, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+# IPUMS person and household weights, offered in the weight selectors.
+WEIGHT_COLUMNS = ("PERWT", "HHWT")
+
+
+def available_weights(columns: Iterable[str]) -> List[str]:
+    """
+    Return the known weight variables present in the columns.
+    """
+    columns = set(columns)
+    return [column for column in WEIGHT_COLUMNS if column in columns]
+
+
+def weight_array(df: pd.DataFrame, weight: str | None) -> np.ndarray | None:
+    """
+    Return the weight column as a float array, or None when unweighted.
+    Missing weights count as 0 so their rows don't contribute.
+
+    Parameters:
+    df (pd.DataFrame): The (filtered) data.
+    weight (str): Name of the weight column, None for unweighted results.
+
+    Returns:
+    np.ndarray | None: The weights aligned with the rows of `df`.
+    """
+    if weight is None:
+        return None
+    if weight not in df.columns:
+        raise ValueError(f"Unknown weight column {weight!r}")
+    weights = df[weight].to_numpy(dtype=float)
+    if np.isnan(weights).any():
+        weights = np.nan_to_num(weights, nan=0.0)
+    return weights
+
+
+def weighted_counts(
+    codes: np.ndarray, size: int, weights: np.ndarray | None = None
+) -> np.ndarray:
+    """
+    Sum the weights (count the rows when unweighted) of every code.
+
+    Parameters:
+    codes (np.ndarray): Integer codes, -1 marking missing values.
+    size (int): Number of distinct codes.
+    weights (np.ndarray): Row weights (optional).
+
+    Returns:
+    np.ndarray: The total per code.
+    """
+    valid = codes >= 0
+    return np.bincount(
+        codes[valid],
+        weights=None if weights is None else weights[valid],
+        minlength=size,
+    )
+
+
+def weighted_sums(
+    codes: np.ndarray,
+    size: int,
+    values: np.ndarray,
+    weights: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Sum weight * value per code, ignoring missing values.
+    """
+    valid = (codes >= 0) & ~np.isnan(values)
+    products = values[valid] if weights is None else values[valid] * weights[valid]
+    return np.bincount(codes[valid], weights=products, minlength=size)
+
+
+def weighted_means(
+    codes: np.ndarray,
+    size: int,
+    values: np.ndarray,
+    weights: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Weighted mean of the values per code, NaN for codes without weight.
+    """
+    present = np.where(np.isnan(values), -1, codes)
+    totals = weighted_counts(present, size, weights)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return weighted_sums(codes, size, values, weights) / totals
+
+
+def weighted_proportions(
+    codes_a: np.ndarray,
+    size_a: int,
+    codes_b: np.ndarray,
+    size_b: int,
+    weights: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Share of every b value within each a value, in percent.
+
+    Returns:
+    np.ndarray: A (size_a, size_b) array whose non-empty rows sum to 100.
+    """
+    valid = (codes_a >= 0) & (codes_b >= 0)
+    totals = np.bincount(
+        codes_a[valid] * size_b + codes_b[valid],
+        weights=None if weights is None else weights[valid],
+        minlength=size_a * size_b,
+    ).reshape(size_a, size_b)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return 100 * totals / totals.sum(axis=1, keepdims=True)
+
+
+def weighted_quantiles(
+    codes: np.ndarray,
+    size: int,
+    values: np.ndarray,
+    quantiles: Sequence[float],
+    weights: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Weighted quantiles of the values of every code with a single sort.
+
+    The rows are sorted by (code, value) and the cumulative weight is
+    computed once; since it never decreases, the position of every
+    (code, quantile) target is found with one vectorized binary search. The
+    quantile is the smallest value whose cumulative weight within its code
+    reaches the requested share of the code's total weight.
+
+    Parameters:
+    codes (np.ndarray): Integer codes, -1 marking missing values.
+    size (int): Number of distinct codes.
+    values (np.ndarray): The numeric values.
+    quantiles (list): Requested quantiles between 0 and 1.
+    weights (np.ndarray): Row weights, every row weighs 1 when omitted.
+
+    Returns:
+    np.ndarray: A (size, len(quantiles)) array, NaN for codes without weight.
+    """
+    valid = (codes >= 0) & ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+    weights = np.ones(len(values)) if weights is None else weights[valid]
+
+    order = np.lexsort((values, codes))
+    codes, values, weights = codes[order], values[order], weights[order]
+    cumulative = np.cumsum(weights)
+
+    totals = np.bincount(codes, weights=weights, minlength=size)
+    before = np.concatenate([[0.0], np.cumsum(totals)[:-1]])
+    targets = before[:, None] + totals[:, None] * np.asarray(quantiles)[None, :]
+    positions = np.searchsorted(cumulative, targets, side="left")
+
+    # Keep every position inside its own code's rows: a 0 quantile or
+    # floating point error can land a target on a neighbouring code
+    rows = np.bincount(codes, minlength=size)
+    ends = np.cumsum(rows)
+    positions = np.clip(
+        positions, (ends - rows)[:, None], np.maximum(ends - 1, 0)[:, None]
+    )
+
+    result = np.full(targets.shape, np.nan)
+    has_weight = totals > 0
+    if len(values):
+        result[has_weight] = values[positions[has_weight]]
+    return result